@@ -0,0 +1,94 @@
+"""Attribute get/set/delete on Munch versus the previous exception-driven
+access protocol, which probed ``object.__getattribute__`` and caught
+AttributeError/KeyError on every key access.
+"""
+from common import best_of, header, report
+
+from munch import DefaultMunch, Munch
+
+
+class LegacyMunch(dict):
+    def __getattr__(self, k):
+        try:
+            return object.__getattribute__(self, k)
+        except AttributeError:
+            try:
+                return self[k]
+            except KeyError:
+                raise AttributeError(k)
+
+    def __setattr__(self, k, v):
+        try:
+            object.__getattribute__(self, k)
+        except AttributeError:
+            try:
+                self[k] = v
+            except:
+                raise AttributeError(k)
+        else:
+            object.__setattr__(self, k, v)
+
+    def __delattr__(self, k):
+        try:
+            object.__getattribute__(self, k)
+        except AttributeError:
+            try:
+                del self[k]
+            except KeyError:
+                raise AttributeError(k)
+        else:
+            object.__delattr__(self, k)
+
+
+class LegacyDefaultMunch(LegacyMunch):
+    def __getattr__(self, k):
+        try:
+            return super().__getattr__(k)
+        except AttributeError:
+            return None
+
+    def __getitem__(self, k):
+        try:
+            return super().__getitem__(k)
+        except KeyError:
+            return None
+
+
+def run(old, new, default_old, default_new):
+    def get_hit(m):
+        return lambda: m.hello
+
+    def get_miss(m):
+        return lambda: getattr(m, "missing", None)
+
+    def set_new_key(m):
+        def f():
+            m.fresh = 1
+            del m.fresh
+        return f
+
+    def set_existing_key(m):
+        def f():
+            m.hello = "world"
+        return f
+
+    cases = [
+        ("get existing key", get_hit),
+        ("get missing key (getattr default)", get_miss),
+        ("set existing key", set_existing_key),
+        ("set + delete new key", set_new_key),
+    ]
+    header("legacy", "munch")
+    for label, make in cases:
+        report(label, best_of(make(old)), best_of(make(new)))
+    report("DefaultMunch get missing key", best_of(get_hit(default_old)), best_of(get_hit(default_new)))
+    report("DefaultMunch item missing key", best_of(lambda: default_old["x"]), best_of(lambda: default_new["x"]))
+
+
+if __name__ == "__main__":
+    run(
+        LegacyMunch(hello="world"),
+        Munch(hello="world"),
+        LegacyDefaultMunch(),
+        DefaultMunch(None),
+    )
@@ -0,0 +1,46 @@
+"""Decoding throughput of Munch.fromBytes versus Munch.fromJSON (and
+encoding, toBytes versus toJSON) on record lists with repeated keys and on
+a nested configuration document.
+
+Both sides are timed in alternation, so that they see the same machine
+load. fromBytes decodes about 1.2x to 1.3x as fast as fromJSON; toBytes,
+which walks the tree in Python, encodes at about half the speed of the C
+json encoder.
+"""
+import timeit
+
+from common import header, report
+
+from munch import DefaultMunch, Munch
+
+RECORDS = {
+    "items": [{"id": i, "name": f"item{i}", "price": i * 0.25, "active": i % 3 == 0, "tags": ["x", "y"],
+               "owner": {"id": i % 50, "team": f"team{i % 5}"}} for i in range(5000)],
+}
+CONFIG = {
+    "services": {f"svc{i}": {"host": f"10.0.{i // 256}.{i % 256}", "port": 8000 + i, "retries": 3,
+                             "limits": {"rps": 100 * i, "burst": i}, "enabled": True} for i in range(2000)},
+}
+
+
+def best_of_both(baseline, candidate, number=1, repeat=25):
+    """Returns the best per-call times of baseline() and candidate(), timed
+    in alternation."""
+    best = [float("inf"), float("inf")]
+    for _ in range(repeat):
+        for i, func in enumerate((baseline, candidate)):
+            best[i] = min(best[i], timeit.timeit(func, number=number) / number)
+    return best
+
+
+if __name__ == "__main__":
+    header("fromJSON", "fromBytes")
+    for label, data in (("records", RECORDS), ("config", CONFIG)):
+        m = Munch.fromDict(data)
+        text, blob = m.toJSON(), m.toBytes()
+        assert Munch.fromBytes(blob) == Munch.fromJSON(text)
+        report(f"decode {label}", *best_of_both(lambda: Munch.fromJSON(text), lambda: Munch.fromBytes(blob)))
+        report(f"decode {label}, DefaultMunch",
+               *best_of_both(lambda: DefaultMunch.fromJSON(text), lambda: DefaultMunch.fromBytes(blob)))
+        report(f"encode {label} (toJSON / toBytes)", *best_of_both(m.toJSON, m.toBytes))
+        print(f"{'':<40} {len(text.encode()):>10} B  {len(blob):>10} B")
@@ -0,0 +1,48 @@
+"""Repeated toJSON() of a large, mostly static config: Munch (json.dumps of
+the whole tree every time) versus CachedMunch, with none, 1% and all of its
+nodes changed between calls. Both sides make the same changes before each
+call; with all nodes changed, CachedMunch falls back to json.dumps (see
+CACHED_JSON_REBUILD_FRACTION), so what remains of the difference is the
+cost of the changes themselves, reported on its own.
+"""
+from common import best_of, header, report
+
+from munch import CachedMunch, Munch
+
+CONFIG = {
+    "features": {f"flag{i}": {"enabled": i % 2 == 0, "rollout": i} for i in range(500)},
+    "routes": {f"/api/v{i % 3}/r{i}": {"backend": f"svc{i % 10}", "timeout": 30} for i in range(1000)},
+}
+
+
+def nodes_of(m):
+    return list(m.features.values()) + list(m.routes.values())
+
+
+if __name__ == "__main__":
+    plain, cached = Munch.fromDict(CONFIG), CachedMunch.fromDict(CONFIG)
+    assert plain.toJSON() == cached.toJSON()
+    counter = iter(range(10 ** 9))
+
+    def change_and_encode(m, changed):
+        tick = next(counter)
+        for node in changed:
+            node.tick = tick
+        return m.toJSON()
+
+    def change(changed):
+        tick = next(counter)
+        for node in changed:
+            node.tick = tick
+
+    header("Munch", "CachedMunch")
+    report("toJSON, 0% changed", best_of(plain.toJSON, number=20), best_of(cached.toJSON, number=20))
+    for label, step, number in (("1%", 100, 20), ("100%", 1, 5)):
+        plain_nodes, cached_nodes = nodes_of(plain)[::step], nodes_of(cached)[::step]
+        # CachedMunch assignment also invalidates caches; shown on its own
+        report(f"changes only, {label}",
+               best_of(lambda: change(plain_nodes), number=number),
+               best_of(lambda: change(cached_nodes), number=number))
+        report(f"changes + toJSON, {label} changed",
+               best_of(lambda: change_and_encode(plain, plain_nodes), number=number),
+               best_of(lambda: change_and_encode(cached, cached_nodes), number=number))
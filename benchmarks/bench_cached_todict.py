@@ -0,0 +1,29 @@
+"""Repeated toDict() of a large, mostly static config: Munch (a full
+unmunchify every time) versus CachedMunch, untouched and after changing one
+leaf between calls.
+"""
+from common import best_of, header, report
+
+from munch import CachedMunch, Munch
+
+CONFIG = {
+    "features": {f"flag{i}": {"enabled": i % 2 == 0, "rollout": i} for i in range(500)},
+    "routes": {f"/api/v{i % 3}/r{i}": {"backend": f"svc{i % 10}", "timeout": 30} for i in range(1000)},
+}
+
+
+if __name__ == "__main__":
+    plain, cached = Munch.fromDict(CONFIG), CachedMunch.fromDict(CONFIG)
+    assert plain.toDict() == cached.toDict()
+    counter = iter(range(10 ** 9))
+
+    def mutate_and_convert():
+        cached.features.flag7.rollout = next(counter)
+        return cached.toDict()
+
+    header("Munch", "CachedMunch")
+    report("toDict, unchanged", best_of(plain.toDict, number=20), best_of(cached.toDict, number=20))
+    report("vars(), unchanged", best_of(lambda: vars(plain), number=20), best_of(lambda: vars(cached), number=20))
+    report("toDict after one leaf change", best_of(plain.toDict, number=20), best_of(mutate_and_convert, number=20))
+    report("attribute assignment", best_of(lambda: setattr(plain.features.flag7, "rollout", 1)),
+           best_of(lambda: setattr(cached.features.flag7, "rollout", 1)))
@@ -0,0 +1,48 @@
+"""Copying Munches: the shallow ``copy()``/``copy.copy`` and dedicated
+``__deepcopy__`` versus the previous behaviour, where ``copy()`` was a full
+recursive ``fromDict`` and ``copy``-module calls went through ``__reduce_ex__``.
+"""
+import copy
+
+from common import best_of, header, report
+
+from munch import DefaultMunch, Munch
+
+
+class ReduceMunch(Munch):
+    __copy__ = None
+    __deepcopy__ = None
+
+
+class ReduceDefaultMunch(DefaultMunch):
+    __copy__ = None
+    __deepcopy__ = None
+
+
+def make_config(cls, *args):
+    return cls.fromDict(
+        {
+            "service": {"name": "api", "port": 8080, "hosts": ["a", "b", "c"]},
+            "limits": {f"route{i}": {"rps": i, "burst": 2 * i} for i in range(50)},
+            "debug": False,
+        },
+        *args
+    )
+
+
+if __name__ == "__main__":
+    header("previous", "munch")
+    for label, old_cls, new_cls, args in (
+        ("Munch", ReduceMunch, Munch, ()),
+        ("DefaultMunch", ReduceDefaultMunch, DefaultMunch, (None,)),
+    ):
+        old, new = make_config(old_cls, *args), make_config(new_cls, *args)
+        report(f"{label}.copy() (was fromDict)", best_of(old.deep_copy, number=500), best_of(new.copy, number=500))
+        report(
+            f"copy.copy({label})", best_of(lambda: copy.copy(old), number=500), best_of(lambda: copy.copy(new), number=500)
+        )
+        report(
+            f"copy.deepcopy({label})",
+            best_of(lambda: copy.deepcopy(old), number=100),
+            best_of(lambda: copy.deepcopy(new), number=100),
+        )
@@ -0,0 +1,47 @@
+"""Building Munches from homogeneous rows: ``Munch.from_records`` versus
+constructing each one with ``Munch(zip(keys, row))`` / ``Munch(row)``, and
+the memory of the resulting list.
+"""
+import tracemalloc
+
+from common import best_of, header, report
+
+from munch import Munch
+
+KEYS = ("id", "name", "email", "active", "score")
+
+
+def make_rows(n=20000):
+    return [(i, f"user{i}", f"user{i}@example.com", bool(i % 2), i * 0.5) for i in range(n)]
+
+
+def make_dict_rows(n=20000):
+    # Fresh key strings per row, as produced by some drivers and parsers
+    return [{"".join(k): v for k, v in zip(KEYS, row)} for row in make_rows(n)]
+
+
+def peak(func):
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+if __name__ == "__main__":
+    rows = make_rows()
+    header("per-row Munch", "from_records")
+    report(
+        "tuple rows",
+        best_of(lambda: [Munch(zip(KEYS, row)) for row in rows], number=3),
+        best_of(lambda: Munch.from_records(rows, keys=KEYS), number=3),
+    )
+    report(
+        "dict rows",
+        best_of(lambda: [Munch(row) for row in make_dict_rows()], number=3),
+        best_of(lambda: Munch.from_records(make_dict_rows()), number=3),
+    )
+    old = peak(lambda: [Munch(row) for row in make_dict_rows()])
+    new = peak(lambda: Munch.from_records(make_dict_rows()))
+    print(f"retained memory, dict rows: per-row {old / 1e6:.1f} MB, from_records {new / 1e6:.1f} MB")
@@ -0,0 +1,38 @@
+"""Memory retained by a cache of separately loaded API responses, with and
+without intern_keys, plus the load-time cost of interning.
+"""
+import json
+import tracemalloc
+
+from common import best_of, header, report
+
+from munch import Munch
+
+DOCUMENTS = [
+    json.dumps({
+        "request_identifier": i,
+        "customer_account": {"display_name": f"user{i}", "billing_country": "NL"},
+        "line_items": [{"product_code": j, "unit_price_cents": 100 * j} for j in range(5)],
+    })
+    for i in range(20000)
+]
+
+
+def retained(**options):
+    tracemalloc.start()
+    cache = [Munch.fromJSON(doc, **options) for doc in DOCUMENTS]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del cache
+    return size
+
+
+if __name__ == "__main__":
+    plain, interned = retained(), retained(intern_keys=True)
+    print(f"retained for {len(DOCUMENTS)} documents: {plain / 2**20:.1f} MiB, "
+          f"intern_keys {interned / 2**20:.1f} MiB ({plain / interned:.2f}x smaller)")
+
+    header("plain", "intern_keys")
+    doc = DOCUMENTS[0]
+    report("fromJSON", best_of(lambda: Munch.fromJSON(doc), number=20000),
+           best_of(lambda: Munch.fromJSON(doc, intern_keys=True), number=20000))
@@ -0,0 +1,50 @@
+"""Decoding JSON into Munch: single-pass ``Munch.fromJSON`` versus the
+previous ``munchify(json.loads(...))`` two-pass conversion.
+"""
+import json
+import tracemalloc
+
+from common import best_of, header, report
+
+from munch import DefaultMunch, Munch, munchify
+
+
+def make_payload(records=2000):
+    return json.dumps(
+        [
+            {
+                "id": i,
+                "name": f"user{i}",
+                "tags": ["a", "b", "c"],
+                "address": {"street": "Main St", "number": i, "geo": {"lat": 1.5, "lng": 2.5}},
+            }
+            for i in range(records)
+        ]
+    )
+
+
+def two_pass(cls, payload, *args):
+    return munchify(json.loads(payload), factory=lambda d: cls(*(args + (d,))))
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+if __name__ == "__main__":
+    payload = make_payload()
+    print(f"payload: {len(payload) / 1e6:.1f} MB")
+    header("two-pass", "fromJSON")
+    for cls, args in ((Munch, ()), (DefaultMunch, (None,))):
+        report(
+            f"{cls.__name__} decode",
+            best_of(lambda: two_pass(cls, payload, *args), number=5),
+            best_of(lambda: cls.fromJSON(payload, *args), number=5),
+        )
+    old = peak_memory(lambda: two_pass(Munch, payload))
+    new = peak_memory(lambda: Munch.fromJSON(payload))
+    print(f"peak memory: two-pass {old / 1e6:.1f} MB, fromJSON {new / 1e6:.1f} MB")
@@ -0,0 +1,48 @@
+"""JSON Lines throughput: ``Munch.iter_jsonl``/``Munch.dump_jsonl`` versus
+a per-line ``Munch.fromJSON``/``toJSON`` loop, plus peak memory while
+streaming a file much larger than the batch size.
+"""
+import io
+import tracemalloc
+
+from common import best_of
+
+from munch import Munch
+
+RECORDS = 20000
+
+
+def make_records():
+    return (Munch(id=i, user=Munch(name=f"user{i}", roles=["a", "b"]), ok=True) for i in range(RECORDS))
+
+
+def loop_write(records, out):
+    for record in records:
+        out.write(record.toJSON())
+        out.write("\n")
+
+
+def loop_read(stream):
+    return [Munch.fromJSON(line) for line in stream if line.strip()]
+
+
+if __name__ == "__main__":
+    text = io.StringIO()
+    Munch.dump_jsonl(make_records(), text)
+    data = text.getvalue()
+
+    write_loop = best_of(lambda: loop_write(make_records(), io.StringIO()), number=1)
+    write_stream = best_of(lambda: Munch.dump_jsonl(make_records(), io.StringIO()), number=1)
+    read_loop = best_of(lambda: loop_read(io.StringIO(data)), number=1)
+    read_stream = best_of(lambda: sum(1 for _ in Munch.iter_jsonl(io.StringIO(data))), number=1)
+    print(f"{RECORDS} records, {len(data) / 1e6:.1f} MB")
+    print(f"write: per-line toJSON {write_loop * 1e3:.1f} ms, dump_jsonl {write_stream * 1e3:.1f} ms")
+    print(f"read:  per-line fromJSON {read_loop * 1e3:.1f} ms, iter_jsonl {read_stream * 1e3:.1f} ms")
+
+    stream = io.StringIO(data)
+    tracemalloc.start()
+    for _ in Munch.iter_jsonl(stream):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"peak memory while streaming: {peak / 1e3:.0f} kB")
@@ -0,0 +1,28 @@
+"""Reading a few fields from a large payload: ``munchify(d, lazy=True)``
+versus eager ``munchify(d)``.
+"""
+from common import best_of, header, report
+
+from munch import munchify
+
+
+def make_payload(nodes=10000):
+    return {
+        "status": "ok",
+        "meta": {"page": 1, "request": {"id": "abc"}},
+        "results": {f"r{i}": {"id": i, "attrs": {"x": i, "y": [i, {"z": i}]}} for i in range(nodes)},
+    }
+
+
+def read_fields(m):
+    return m.status, m.meta.request.id, m.results.r42.attrs.y[1].z
+
+
+if __name__ == "__main__":
+    payload = make_payload()
+    header("eager", "lazy")
+    report(
+        "munchify + read 3 fields",
+        best_of(lambda: read_fields(munchify(payload)), number=5),
+        best_of(lambda: read_fields(munchify(payload, lazy=True)), number=5),
+    )
@@ -0,0 +1,47 @@
+"""Process start-up on a large static dataset: loading it with fromJSON
+versus opening the file written by Munch.save_mmap, before and after
+reading one value, and the cost of reads through the memory-mapped view.
+"""
+import os
+import tempfile
+
+from common import best_of, header, report
+
+from munch import Munch
+
+DATA = {
+    "cities": {f"city{i}": {"name": f"City {i}", "population": i * 1000, "coords": [i / 3, -i / 7],
+                            "zones": [f"z{i % 7}", f"z{i % 11}"]} for i in range(50000)},
+}
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return Munch.fromJSON(f)
+
+
+if __name__ == "__main__":
+    m = Munch.fromDict(DATA)
+    directory = tempfile.mkdtemp()
+    json_path, mmap_path = os.path.join(directory, "data.json"), os.path.join(directory, "data.munch")
+    with open(json_path, "w", encoding="utf-8") as f:
+        f.write(m.toJSON())
+    Munch.save_mmap(m, mmap_path)
+    view = Munch.open_mmap(mmap_path)
+    assert view.cities.city777.coords[1] == m.cities.city777.coords[1]
+    print(f"JSON: {os.path.getsize(json_path)} bytes, save_mmap: {os.path.getsize(mmap_path)} bytes")
+
+    header("fromJSON", "open_mmap")
+    report("open", best_of(lambda: load_json(json_path), number=1),
+           best_of(lambda: Munch.open_mmap(mmap_path), number=100))
+    report("open and read one value", best_of(lambda: load_json(json_path).cities.city777.population, number=1),
+           best_of(lambda: Munch.open_mmap(mmap_path).cities.city777.population, number=100))
+    report("read cities.city777.population", best_of(lambda: m.cities.city777.population),
+           best_of(lambda: view.cities.city777.population, number=10000))
+    header("Munch.toJSON", "Munch.save_mmap")
+    report("write", best_of(lambda: m.toJSON(), number=1, repeat=3),
+           best_of(lambda: Munch.save_mmap(m, mmap_path), number=1, repeat=3))
+    del view
+    os.remove(json_path)
+    os.remove(mmap_path)
+    os.rmdir(directory)
@@ -0,0 +1,67 @@
+"""munchify/unmunchify: the iterative, table-dispatched implementation
+versus the previous recursive closure-based one, on a wide tree.
+"""
+from common import best_of, header, report
+
+from munch import Munch, munchify, unmunchify
+from munch.python3_compat import Mapping
+
+
+def legacy_munchify(x, factory=Munch):
+    seen = dict()
+
+    def munchify_cycles(obj):
+        try:
+            return seen[id(obj)]
+        except KeyError:
+            pass
+        seen[id(obj)] = partial = pre_munchify(obj)
+        return post_munchify(partial, obj)
+
+    def pre_munchify(obj):
+        if isinstance(obj, Mapping):
+            return factory({})
+        elif isinstance(obj, list):
+            return type(obj)()
+        elif isinstance(obj, tuple):
+            type_factory = getattr(obj, "_make", type(obj))
+            return type_factory(munchify_cycles(item) for item in obj)
+        else:
+            return obj
+
+    def post_munchify(partial, obj):
+        if isinstance(obj, Mapping):
+            partial.update((k, munchify_cycles(obj[k])) for k in obj.keys())
+        elif isinstance(obj, list):
+            partial.extend(munchify_cycles(item) for item in obj)
+        elif isinstance(obj, tuple):
+            for item_partial, item in zip(partial, obj):
+                post_munchify(item_partial, item)
+        return partial
+
+    return munchify_cycles(x)
+
+
+def legacy_unmunchify(x):
+    return legacy_munchify(x, factory=lambda d: dict())
+
+
+def make_tree(records=5000):
+    return {
+        "records": [
+            {"id": i, "name": f"n{i}", "tags": ["a", "b"], "pos": (i, {"x": 1.0}), "meta": {"ok": True, "n": None}}
+            for i in range(records)
+        ]
+    }
+
+
+if __name__ == "__main__":
+    tree = make_tree()
+    munched = munchify(tree)
+    header("legacy", "munch")
+    report("munchify wide tree", best_of(lambda: legacy_munchify(tree), number=3), best_of(lambda: munchify(tree), number=3))
+    report(
+        "unmunchify wide tree",
+        best_of(lambda: legacy_unmunchify(munched), number=3),
+        best_of(lambda: unmunchify(munched), number=3),
+    )
@@ -0,0 +1,72 @@
+"""Bulk munchify: ``munchify_many``'s process pool versus an in-process list
+comprehension, over growing batch sizes, to locate the crossover point that
+``PARALLEL_THRESHOLD`` should sit at on a given machine.
+
+The pool is always used here, even with one worker (munchify_many itself
+converts in-process then), for each worker count given on the command line,
+or 2 up to os.cpu_count(). The per-record costs printed first give the
+crossover expected with k workers on k free cores, which is what to look at
+on a machine with fewer cores than that.
+"""
+import os
+import pickle
+import sys
+import time
+
+from common import header, report
+
+import munch
+from munch import Munch, munchify
+
+
+def make_records(n):
+    return [{"id": i, "user": {"name": f"u{i}", "roles": ["a", "b"]}, "geo": {"lat": 1.0, "lng": 2.0}} for i in range(n)]
+
+
+def timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def in_pool(records, workers):
+    return list(munch._convert_in_pool(munchify, (Munch,), iter(records), workers, 2000))  # pylint: disable=protected-access
+
+
+def expected_crossover(workers_list):
+    """Estimates the records from which a pool of k workers on k free cores
+    wins, from the per-record costs measured in this process."""
+    n = 20000
+    records = make_records(n)
+    results = [munchify(r) for r in records]
+    data_in, data_out = pickle.dumps(records, -1), pickle.dumps(results, -1)
+    convert = timed(lambda: [munchify(r) for r in records]) / n
+    # The parent pickles the records and unpickles the results; each worker
+    # does the reverse, and the conversion
+    parent = (timed(lambda: pickle.dumps(records, -1)) + timed(lambda: pickle.loads(data_out))) / n
+    worker = (timed(lambda: pickle.loads(data_in)) + timed(lambda: pickle.dumps(results, -1))) / n + convert
+    startup = timed(lambda: in_pool(make_records(10), workers_list[0]))
+    print(f"per record: munchify {convert * 1e6:.1f} us, parent {parent * 1e6:.1f} us, "
+          f"worker {worker * 1e6:.1f} us; pool start-up {startup * 1e3:.0f} ms")
+    for k in workers_list:
+        gain = convert - max(parent, worker / k)
+        estimate = f"{startup / gain:.0f} records" if gain > 0 else "never"
+        print(f"expected crossover with {k} workers on {k} cores: {estimate}")
+
+
+if __name__ == "__main__":
+    cpus = os.cpu_count() or 1
+    workers_list = [int(arg) for arg in sys.argv[1:]] or list(range(2, max(cpus, 2) + 1))
+    print(f"cpus: {cpus}, PARALLEL_THRESHOLD: {munch.PARALLEL_THRESHOLD}")
+    expected_crossover(workers_list)
+    for workers in workers_list:
+        print(f"\nworkers: {workers}")
+        header("in-process", "pool")
+        for n in (1000, 10000, 50000, 200000):
+            records = make_records(n)
+            report(f"{n} records", timed(lambda: [munchify(r) for r in records], 1),
+                   timed(lambda: in_pool(records, workers), 1))
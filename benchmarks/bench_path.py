@@ -0,0 +1,47 @@
+"""Dotted-path access: get_path/set_path against hand-written getattr
+chains (reduce over str.split) and an auto-creating setter.
+"""
+from functools import reduce
+
+from common import best_of, header, report
+
+from munch import Munch
+
+CONFIG = Munch.fromDict({"service": {"http": {"limits": {"rps": 100, "burst": [1, 2, 3]}}}})
+
+
+def getattr_chain(m, path):
+    return reduce(getattr, path.split("."), m)
+
+
+def get_default(m, path, default=None):
+    try:
+        return reduce(getattr, path.split("."), m)
+    except AttributeError:
+        return default
+
+
+def manual_set(m, path, value):
+    *parents, last = path.split(".")
+    for key in parents:
+        if key not in m:
+            m[key] = Munch()
+        m = m[key]
+    m[last] = value
+
+
+if __name__ == "__main__":
+    header("getattr", "path")
+    report("4-level get", best_of(lambda: getattr_chain(CONFIG, "service.http.limits.rps")),
+           best_of(lambda: CONFIG.get_path("service.http.limits.rps")))
+    report("4-level get, missing with default",
+           best_of(lambda: get_default(CONFIG, "service.http.timeouts.read")),
+           best_of(lambda: CONFIG.get_path("service.http.timeouts.read")))
+    report("direct attribute chain (no parsing)",
+           best_of(lambda: CONFIG.service.http.limits.rps),
+           best_of(lambda: CONFIG.get_path("service.http.limits.rps")))
+    report("get with list index",
+           best_of(lambda: CONFIG.service.http.limits.burst[2]),
+           best_of(lambda: CONFIG.get_path("service.http.limits.burst[2]")))
+    report("4-level set", best_of(lambda: manual_set(CONFIG, "service.http.limits.rps", 5)),
+           best_of(lambda: CONFIG.set_path("service.http.limits.rps", 5)))
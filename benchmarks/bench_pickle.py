@@ -0,0 +1,57 @@
+"""Pickle round trips of Munch trees: the previous pickling (copyreg's
+reduce, pickling the items both as dictitems and as a __getstate__ copy)
+versus Munch.__reduce_ex__, plus protocol 5 out-of-band buffers for
+bytes values.
+"""
+import pickle
+
+from common import best_of, header, report
+
+from munch import DefaultMunch, Munch
+
+DOC = {
+    "users": [{"id": i, "name": f"user{i}", "tags": ["a", "b"], "address": {"city": "x", "zip": i}}
+              for i in range(500)],
+}
+BLOBS = {f"blob{i}": bytes(256 * 1024) for i in range(16)}
+
+
+class OldMunch(Munch):
+    def __reduce_ex__(self, protocol):
+        return object.__reduce_ex__(self, protocol)
+
+
+class OldDefaultMunch(DefaultMunch):
+    def __reduce_ex__(self, protocol):
+        return object.__reduce_ex__(self, protocol)
+
+
+def round_trip(obj, protocol):
+    return pickle.loads(pickle.dumps(obj, protocol))
+
+
+def out_of_band(obj):
+    buffers = []
+    data = pickle.dumps(obj, 5, buffer_callback=buffers.append)
+    return pickle.loads(data, buffers=buffers)
+
+
+if __name__ == "__main__":
+    old, new = OldMunch.fromDict(DOC), Munch.fromDict(DOC)
+    old_default, new_default = OldDefaultMunch.fromDict(DOC, "?"), DefaultMunch.fromDict(DOC, "?")
+    assert round_trip(new, 5) == round_trip(old, 5) and round_trip(new_default, 5).missing == "?"
+
+    header("previous", "__reduce_ex__")
+    for protocol in (2, 4, 5):
+        report(f"Munch dumps, protocol {protocol}", best_of(lambda: pickle.dumps(old, protocol), number=20),
+               best_of(lambda: pickle.dumps(new, protocol), number=20))
+        report(f"Munch round trip, protocol {protocol}", best_of(lambda: round_trip(old, protocol), number=20),
+               best_of(lambda: round_trip(new, protocol), number=20))
+    report("DefaultMunch round trip, protocol 5", best_of(lambda: round_trip(old_default, 5), number=20),
+           best_of(lambda: round_trip(new_default, 5), number=20))
+    print("pickle size, protocol 5: {} -> {} bytes".format(len(pickle.dumps(old, 5)), len(pickle.dumps(new, 5))))
+
+    header("in-band", "out-of-band")
+    blobs = Munch(BLOBS)
+    report("4 MB of bytes values, protocol 5", best_of(lambda: round_trip(blobs, 5), number=20),
+           best_of(lambda: out_of_band(blobs), number=20))
@@ -0,0 +1,37 @@
+"""Projection queries over many records: a compiled query and query_many
+against parsing the expression for every record, and against the nested
+comprehension they replace.
+"""
+from common import best_of, header, report
+
+from munch import Munch, compile_query, query_many
+from munch import _compile_query  # pylint: disable=no-name-in-module
+
+RECORDS = [
+    Munch.fromDict({
+        "id": i,
+        "items": [{"owner": {"id": i * 10 + j}, "price": j * 3} for j in range(5)],
+    })
+    for i in range(2000)
+]
+
+
+def reinterpreted(records, expression):
+    # Parsing and compiling per record, as an uncached interpreter would
+    return [_compile_query.__wrapped__(expression)(record) for record in records]
+
+
+if __name__ == "__main__":
+    q = compile_query("items[*].owner.id")
+    assert q(RECORDS[0]) == [item.owner.id for item in RECORDS[0]["items"]]
+
+    header("baseline", "compiled")
+    report("vs parsing per record", best_of(lambda: reinterpreted(RECORDS, "items[*].owner.id"), number=3),
+           best_of(lambda: query_many(RECORDS, q), number=3))
+    report("vs nested comprehension",
+           best_of(lambda: [[item.owner.id for item in r["items"]] for r in RECORDS], number=3),
+           best_of(lambda: query_many(RECORDS, q), number=3))
+    f = compile_query("items[?price > 6].owner.id")
+    report("filter vs comprehension",
+           best_of(lambda: [[i.owner.id for i in r["items"] if i.price > 6] for r in RECORDS], number=3),
+           best_of(lambda: query_many(RECORDS, f), number=3))
@@ -0,0 +1,34 @@
+"""Memory per record: a ``Munch.schema`` slotted class versus a plain Munch
+holding the same three fields, plus attribute read cost for each.
+"""
+import tracemalloc
+
+from common import best_of, header, report
+
+from munch import Munch
+
+FIELDS = ("id", "name", "email")
+COUNT = 100000
+
+
+def measure(build):
+    tracemalloc.start()
+    records = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return records, size / COUNT
+
+
+if __name__ == "__main__":
+    User = Munch.schema("User", FIELDS)
+    rows = [(i, f"user{i}", f"user{i}@example.com") for i in range(COUNT)]
+
+    munches, munch_bytes = measure(lambda: [Munch(zip(FIELDS, row)) for row in rows])
+    records, record_bytes = measure(lambda: [User(id=a, name=b, email=c) for a, b, c in rows])
+    print(f"bytes per record: Munch {munch_bytes:.0f}, User {record_bytes:.0f} "
+          f"({munch_bytes / record_bytes:.1f}x smaller)")
+
+    header("Munch", "schema")
+    m, u = munches[0], records[0]
+    report("attribute read", best_of(lambda: m.name, number=200000),
+           best_of(lambda: u.name, number=200000))
@@ -0,0 +1,36 @@
+"""Worker start-up with a large reference-data Munch: unpickling a private
+copy (what each worker of a pool pays today) versus attaching to it in
+shared memory, and the cost of reading through the shared view afterwards.
+"""
+import pickle
+
+from common import best_of, header, report
+
+from munch import Munch
+
+DATA = {
+    "products": {f"sku{i}": {"name": f"product {i}", "price": i * 0.5, "stock": i, "tags": ["a", "b"]}
+                 for i in range(20000)},
+}
+
+
+if __name__ == "__main__":
+    m = Munch.fromDict(DATA)
+    blob = pickle.dumps(m, pickle.HIGHEST_PROTOCOL)
+    shm = m.to_shared_memory()
+    try:
+        view = Munch.open_shared_memory(shm.name)
+        assert view.products.sku123.price == m.products.sku123.price
+        print(f"pickle: {len(blob)} bytes, shared memory block: {shm.size} bytes")
+
+        header("private copy", "shared view")
+        report("start-up (unpickle / attach)", best_of(lambda: pickle.loads(blob), number=3),
+               best_of(lambda: Munch.open_shared_memory(shm.name), number=100))
+        report("start-up and read one value", best_of(lambda: pickle.loads(blob).products.sku123.price, number=3),
+               best_of(lambda: Munch.open_shared_memory(shm.name).products.sku123.price, number=100))
+        report("read products.sku123.price", best_of(lambda: m.products.sku123.price),
+               best_of(lambda: view.products.sku123.price, number=10000))
+        del view
+    finally:
+        shm.close()
+        shm.unlink()
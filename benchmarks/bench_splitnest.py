@@ -0,0 +1,57 @@
+"""Nesting and flattening large environment-style flat configs: the
+previous recursive splitnest followed by munchify, and a recursive flatten
+helper, versus splitnest, munchify(split=...) and flatten.
+"""
+from common import best_of, header, report
+
+from munch import Munch, flatten, munchify, splitnest
+
+
+def recursive_splitnest(d, sep="."):
+    def nest(i, e, v):
+        if len(i) < 2:
+            e[i[0]] = v
+        else:
+            nest(i[1:], e.setdefault(i[0], {}), v)
+
+    e = dict()
+    for i, v in d.items():
+        nest(i.split(sep), e, v)
+    return e
+
+
+def recursive_flatten(m, prefix=""):
+    result = {}
+    for k, v in m.items():
+        if isinstance(v, dict) and v:
+            result.update(recursive_flatten(v, prefix + k + "."))
+        else:
+            result[prefix + k] = v
+    return result
+
+
+CONFIGS = {
+    "shared prefixes": {
+        f"service{i % 100}.region{i % 7}.setting{i}": str(i) for i in range(100000)
+    },
+    "unique prefixes": {
+        f"service{i % 100}.region{i % 7}.setting{i}.value": str(i) for i in range(100000)
+    },
+    "30-level keys": {
+        ".".join(f"level{j}" for j in range(29)) + f".key{i}": i for i in range(20000)
+    },
+}
+
+
+if __name__ == "__main__":
+    header("previous", "munch")
+    for name, flat in CONFIGS.items():
+        nested = munchify(splitnest(flat))
+        assert munchify(flat, split=".") == nested and flatten(nested) == flat
+        report(f"{name}: splitnest", best_of(lambda: recursive_splitnest(flat), number=3, repeat=3),
+               best_of(lambda: splitnest(flat), number=3, repeat=3))
+        report(f"{name}: + munchify / split=",
+               best_of(lambda: munchify(recursive_splitnest(flat)), number=3, repeat=3),
+               best_of(lambda: Munch.fromDict(flat, split="."), number=3, repeat=3))
+        report(f"{name}: flatten", best_of(lambda: recursive_flatten(nested), number=3, repeat=3),
+               best_of(lambda: flatten(nested), number=3, repeat=3))
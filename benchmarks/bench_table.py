@@ -0,0 +1,36 @@
+"""Per-field aggregates over a list of Munches versus the same records in a
+MunchTable, plus the memory each takes.
+"""
+import tracemalloc
+
+from common import best_of, header, report
+
+from munch import Munch, MunchTable
+
+COUNT = 100000
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+if __name__ == "__main__":
+    rows = [{"id": i, "price": i * 0.5, "qty": i % 7} for i in range(COUNT)]
+    munches, munch_size = measure(lambda: [Munch(row) for row in rows])
+    table, table_size = measure(lambda: MunchTable.from_rows(rows))
+    print(f"memory for {COUNT} records: list of Munches {munch_size / 2**20:.1f} MiB, "
+          f"MunchTable {table_size / 2**20:.1f} MiB")
+
+    header("Munches", "MunchTable")
+    report("sum of one field", best_of(lambda: sum(m.price for m in munches), number=10),
+           best_of(lambda: sum(table.price), number=10))
+    report("max of one field", best_of(lambda: max(m["qty"] for m in munches), number=10),
+           best_of(lambda: max(table.qty), number=10))
+    report("read one field of row 500", best_of(lambda: munches[500].price, number=100000),
+           best_of(lambda: table[500].price, number=100000))
+    report("from list of dicts", best_of(lambda: [Munch(row) for row in rows], number=3),
+           best_of(lambda: MunchTable.from_rows(rows), number=3))
@@ -0,0 +1,44 @@
+"""Mutation throughput of TrackedMunch against a plain Munch, and the cost
+of producing a patch versus re-sending the whole state with toJSON().
+"""
+import json
+
+from common import best_of, header, report
+
+from munch import Munch, TrackedMunch
+
+STATE = {
+    "tick": 0,
+    "players": {f"p{i}": {"pos": {"x": i, "y": i}, "hp": 100, "items": ["sword"]} for i in range(1000)},
+}
+
+
+if __name__ == "__main__":
+    plain, tracked = Munch.fromDict(STATE), TrackedMunch.fromDict(STATE)
+    plain_pos, tracked_pos = plain.players.p500.pos, tracked.players.p500.pos
+    plain_items, tracked_items = plain.players.p7["items"], tracked.players.p7["items"]
+
+    def append_pop(items):
+        items.append("shield")
+        items.pop()
+
+    header("Munch", "TrackedMunch")
+    report("set top-level leaf", best_of(lambda: setattr(plain, "tick", 1)),
+           best_of(lambda: setattr(tracked, "tick", 1)))
+    report("set leaf 4 levels down", best_of(lambda: setattr(plain_pos, "x", 1)),
+           best_of(lambda: setattr(tracked_pos, "x", 1)))
+    report("item assignment 4 levels down", best_of(lambda: plain_pos.__setitem__("y", 2)),
+           best_of(lambda: tracked_pos.__setitem__("y", 2)))
+    report("list append + pop", best_of(lambda: append_pop(plain_items)),
+           best_of(lambda: append_pop(tracked_items)))
+    report("assign a small mapping", best_of(lambda: setattr(plain_pos, "v", {"dx": 1})),
+           best_of(lambda: setattr(tracked_pos, "v", {"dx": 1})))
+
+    tracked.clear_changes()
+    for i in range(0, 1000, 100):
+        tracked.players[f"p{i}"].hp -= 1
+    tracked.tick += 1
+    header("toJSON()", "patch")
+    report("1% of players changed", best_of(plain.toJSON, number=50),
+           best_of(lambda: json.dumps(tracked.to_json_patch()), number=50))
+    print(f"payload: toJSON {len(plain.toJSON())} bytes, patch {len(json.dumps(tracked.to_json_patch()))} bytes")
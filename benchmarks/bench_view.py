@@ -0,0 +1,22 @@
+"""Attribute-style reads over an existing dict: ``MunchView(d)`` versus
+copying with ``Munch(d)`` / ``munchify(d)`` first.
+"""
+from common import best_of, header, report
+
+from munch import Munch, MunchView, munchify
+
+PAYLOAD = {"config": {"db": {"host": "localhost", "port": 5432}}, "flags": {f"f{i}": i for i in range(500)}}
+
+
+def read(m):
+    return m.config.db.host, m.flags.f7
+
+
+if __name__ == "__main__":
+    header("copy", "view")
+    report("create", best_of(lambda: Munch(PAYLOAD), number=20000), best_of(lambda: MunchView(PAYLOAD), number=20000))
+    report(
+        "munchify/view + 2 reads",
+        best_of(lambda: read(munchify(PAYLOAD)), number=2000),
+        best_of(lambda: read(MunchView(PAYLOAD)), number=2000),
+    )
@@ -0,0 +1,42 @@
+"""YAML load/dump: ``Munch.fromYAML``/``toYAML`` (MunchLoader, libyaml when
+available) versus the previous ``munchify(yaml.load(..., FullLoader))`` and
+pure-Python ``yaml.safe_dump``.
+"""
+import yaml
+
+from common import best_of, header, report
+
+from munch import Munch, munchify
+
+
+def make_document(services=200):
+    return Munch.fromDict(
+        {
+            "apiVersion": "v1",
+            "items": [
+                {
+                    "kind": "Service",
+                    "metadata": {"name": f"svc-{i}", "labels": {"app": f"app-{i}", "tier": "backend"}},
+                    "spec": {"ports": [{"port": 80, "targetPort": 8080 + i}], "selector": {"app": f"app-{i}"}},
+                }
+                for i in range(services)
+            ],
+        }
+    )
+
+
+if __name__ == "__main__":
+    doc = make_document()
+    text = doc.toYAML()
+    print(f"libyaml: {yaml.__with_libyaml__}, document: {len(text) / 1e3:.0f} kB")
+    header("previous", "munch")
+    report(
+        "load",
+        best_of(lambda: munchify(yaml.load(text, Loader=yaml.FullLoader)), number=1),
+        best_of(lambda: Munch.fromYAML(text), number=1),
+    )
+    report(
+        "dump",
+        best_of(lambda: yaml.safe_dump(doc, indent=4, default_flow_style=False), number=1),
+        best_of(doc.toYAML, number=1),
+    )
@@ -0,0 +1,30 @@
+"""Small timing helpers shared by the benchmark scripts.
+
+Each ``bench_*.py`` script in this directory is standalone; run it from the
+project root, e.g.::
+
+    python benchmarks/bench_attribute_access.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def best_of(func, number=100000, repeat=5):
+    """Returns the best per-call time of func() in seconds."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def report(label, baseline, candidate):
+    """Prints a one-line comparison of two per-call timings."""
+    print(
+        "{:<40} {:>10.1f} ns {:>10.1f} ns {:>7.2f}x".format(
+            label, baseline * 1e9, candidate * 1e9, baseline / candidate
+        )
+    )
+
+
+def header(baseline="baseline", candidate="munch"):
+    print("{:<40} {:>13} {:>13} {:>8}".format("", baseline, candidate, "speedup"))
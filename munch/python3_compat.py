@@ -1,5 +1,17 @@
 try:
-    from collections.abc import Mapping  # pylint: disable=unused-import
+    from collections.abc import Mapping, Sequence  # pylint: disable=unused-import
 except ImportError:
     # Legacy Python
-    pass  # pylint: disable=unused-import
+    from collections import Mapping, Sequence  # pylint: disable=unused-import
+
+
+def u(s):
+    return s
+
+
+def iteritems(d, **kw):
+    return iter(d.items(**kw))
+
+
+def iterkeys(d, **kw):
+    return iter(d.keys(**kw))
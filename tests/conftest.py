@@ -8,6 +8,8 @@ def yaml_module():
     try:
         import yaml  # pylint: disable=import-outside-toplevel
 
+        # munch registers with PyYAML on first use when imported before it
+        munch.MunchLoader  # pylint: disable=pointless-statement
         return yaml
     except ImportError:
         pass
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _run(code, *options, **env_overrides):
+    env = dict(os.environ, PYTHONPATH=_ROOT, **env_overrides)
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        env=env,
+        cwd=_ROOT,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+
+
+def _cumulative_import_time(stderr, module):
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and line.split("|")[-1].strip() == module:
+            return int(line.split("|")[1])
+    raise AssertionError(f"{module} not found in -X importtime output")
+
+
+# Cumulative `-X importtime` budget for `import munch`, in microseconds. It
+# takes about 5 ms on a slow single-core machine with a warm bytecode cache;
+# eagerly importing json, pkg_resources or PyYAML costs 10-100 ms more.
+IMPORT_TIME_BUDGET = 20000
+
+
+@pytest.mark.skipif(sys.version_info[:2] < (3, 7), reason="Requires -X importtime")
+def test_import_time_budget(tmp_path):
+    # Measured with a warm bytecode cache of its own, as compiling munch
+    # alone takes several times longer
+    code = "import munch"
+    env = {"PYTHONPYCACHEPREFIX": str(tmp_path), "PYTHONDONTWRITEBYTECODE": ""}
+    _run(code, **env)
+    munch_times = []
+    for _ in range(3):
+        stderr = _run(code, "-X", "importtime", **env).stderr
+        munch_times.append(_cumulative_import_time(stderr, "munch"))
+    assert min(munch_times) < IMPORT_TIME_BUDGET
+
+
+def test_import_is_lazy():
+    result = _run(
+        "import sys, munch; "
+        "print(sorted(m for m in ('json', 'yaml', 'pkg_resources', 'importlib.metadata') if m in sys.modules))"
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_version():
+    result = _run("import munch; print(munch.__version__); print(munch.VERSION)")
+    version, version_tuple = result.stdout.splitlines()
+    assert version_tuple == repr(tuple(map(int, version.split(".")[:3])))
+
+
+def test_yaml_registered_when_imported_first(yaml):  # pylint: disable=unused-argument
+    result = _run("import yaml, munch; print(yaml.dump(munch.Munch(a=1), default_flow_style=True).strip())")
+    assert result.stdout.strip() == "!munch.Munch {a: 1}"
+
+
+def test_yaml_registered_on_first_use(yaml):  # pylint: disable=unused-argument
+    result = _run(
+        "import sys, munch, yaml; hooked = len(sys.meta_path); munch.Munch().toYAML(); "
+        "print(hooked == len(sys.meta_path), yaml.safe_dump(munch.Munch(a=1), default_flow_style=True).strip())"
+    )
+    assert result.stdout.strip() == "True {a: 1}"
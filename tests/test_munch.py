@@ -1,12 +1,27 @@
 # pylint: disable=unnecessary-lambda
+import array
+import copy
+import dataclasses
+import io
 import json
+import os
 import pickle
+import subprocess
+import sys
+import tempfile
+import time
 from collections import namedtuple
+from collections.abc import Mapping
 
 import pytest
 
-from munch import (AutoMunch, DefaultFactoryMunch, DefaultMunch, Munch,
-                   munchify, unmunchify)
+import munch
+from munch import (AutoMunch, CachedMunch, DefaultFactoryMunch, DefaultMunch,
+                   LazyMunch, Munch, MunchTable, MunchView, RecursiveMunch,
+                   SchemaMunch, TrackedMunch, compile_query, flatten,
+                   munchify, munchify_many, query_many, register_converter,
+                   splitnest, unmunchify, unmunchify_many,
+                   unregister_converter)
 
 
 def test_base():
@@ -81,11 +96,266 @@ def test_setattr():
         b["values"]  # pylint: disable=pointless-statement
 
 
+def test_setattr_delattr_shadowed_attribute():
+    b = Munch(foo="bar")
+    b.values = "uh oh"
+    assert b.values == "uh oh"
+    assert "values" not in b
+
+    del b.values
+    assert hasattr(b.values, "__call__")
+    assert "values" not in b
+
+    with pytest.raises(AttributeError):
+        del b.missing
+
+
+def test_setattr_delattr_instance_attribute():
+    b = Munch(foo="bar")
+    object.__setattr__(b, "hidden", 1)
+    b.hidden = 2
+    assert b.hidden == 2
+    assert "hidden" not in b
+
+    del b.hidden
+    assert "hidden" not in b
+    with pytest.raises(AttributeError):
+        b.hidden  # pylint: disable=pointless-statement
+
+
+def test_class_attribute_added_at_runtime():
+    class LateMunch(Munch):
+        pass
+
+    b = LateMunch()
+    b.late = "key"
+    LateMunch.late = "class attribute"
+    munch.refresh_attributes(LateMunch)
+    b.late = "attribute"
+    assert b["late"] == "key"
+    assert b.late == "attribute"
+
+    del b.late
+    assert b.late == "class attribute"
+    assert b["late"] == "key"
+
+    LateMunch.__missing__ = lambda self, k: k.upper()
+    munch.refresh_attributes()
+    assert b.missing == "MISSING"
+
+
+def test_getattr_missing_subclass():
+    class MissingMunch(Munch):
+        def __missing__(self, k):
+            return k * 2
+
+    b = MissingMunch(foo="bar")
+    assert b.foo == "bar"
+    assert b.ab == "abab"
+    assert getattr(Munch(), "missing", 42) == 42
+    assert not hasattr(Munch(), "missing")
+
+
 def test_pickle():
     b = DefaultMunch.fromDict({"a": "b"})
     assert pickle.loads(pickle.dumps(b)) == b
 
 
+class TaggedMunch(Munch):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        object.__setattr__(self, "tag", None)
+
+    def __getstate__(self):
+        return {"tag": self.tag, "items": dict(self)}
+
+    def __setstate__(self, state):
+        object.__setattr__(self, "tag", state["tag"])
+        self.update(state["items"])
+
+
+class TaggedDefaultMunch(DefaultMunch):
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        object.__setattr__(self, "tag", "restored")
+
+
+def test_pickle_reduce():
+    for b in (
+        munchify({"a": {"b": [1, {"c": 2}]}}),
+        DefaultMunch.fromDict({"a": {"b": 1}}, default="x"),
+        DefaultFactoryMunch.fromDict({"a": {"b": 1}}, list),
+        RecursiveMunch.fromDict({"a": {"b": 1}}),
+    ):
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            restored = pickle.loads(pickle.dumps(b, protocol))
+            assert restored == b and type(restored.a) is type(b.a)  # pylint: disable=unidiomatic-typecheck
+    assert pickle.loads(pickle.dumps(DefaultMunch("x", {"a": 1}))).missing == "x"
+    assert pickle.loads(pickle.dumps(DefaultFactoryMunch(list))).missing == []
+    assert isinstance(pickle.loads(pickle.dumps(RecursiveMunch())).missing, RecursiveMunch)
+
+    # each item is pickled once
+    assert pickle.dumps(Munch(key="value"), 2).count(b"value") == 1
+    cyclic = Munch(a=1)
+    cyclic.self = cyclic
+    restored = pickle.loads(pickle.dumps(cyclic))
+    assert restored.self is restored
+
+    # state written by __getstate__ can still be loaded
+    legacy = DefaultMunch.__new__(DefaultMunch)
+    legacy.__setstate__(("x", {"a": 1}))
+    assert legacy == {"a": 1} and legacy.missing == "x"
+
+    # subclasses with their own pickled state keep it
+    tagged = TaggedMunch(a=1)
+    object.__setattr__(tagged, "tag", "t")
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        restored = pickle.loads(pickle.dumps(tagged, protocol))
+        assert restored == {"a": 1} and restored.tag == "t"
+        restored = pickle.loads(pickle.dumps(TaggedDefaultMunch("x", {"a": 1}), protocol))
+        assert restored == {"a": 1} and restored.missing == "x" and restored.tag == "restored"
+
+    blobs = Munch(a=b"ab" * 100, b=bytearray(b"cd"), c=memoryview(b"ef"), d="text")
+    buffers = []
+    data = pickle.dumps(blobs, 5, buffer_callback=buffers.append)
+    assert len(buffers) == 3 and b"ab" * 100 not in data
+    for restored in (pickle.loads(data, buffers=buffers), pickle.loads(pickle.dumps(blobs, 5))):
+        assert restored == blobs
+        assert [type(v) for v in restored.values()] == [bytes, bytearray, memoryview, str]
+
+
+def _read_shared(name, queue):
+    view = Munch.open_shared_memory(name)
+    queue.put((view.users[1].name, view.toDict()))
+
+
+def test_shared_memory():
+    data = {
+        "users": [{"name": "ann", "tags": ("a", "b")}, {"name": "bob", "tags": []}],
+        "counts": {1: -5, 2: 10 ** 30, None: 2.5},
+        "flags": {"on": True, "off": False, "none": None},
+        "blob": b"\x00\xff",
+        "text": "h\u00e9 \ud800",
+        "wide": {f"key\u00e9{i}": i for i in range(40)},
+        "wide_ints": dict.fromkeys(range(40), "x"),
+    }
+    expected = dict(data, users=[{"name": "ann", "tags": ["a", "b"]}, {"name": "bob", "tags": []}])
+    shm = munchify(data).to_shared_memory()
+    try:
+        view = Munch.open_shared_memory(shm.name)
+        assert isinstance(view, MunchView)
+        assert view.users[0].tags[-1] == "b" and view.counts[2] == 10 ** 30 and view.blob == b"\x00\xff"
+        assert view == expected and view.toDict() == expected
+        assert view.wide["key\u00e97"] == 7 and view.wide_ints[7] == "x"
+        assert list(view.wide) == list(data["wide"]) and len(view.wide) == 40
+        assert "key\u00e940" not in view.wide and 7 not in view.wide and 40 not in view.wide_ints
+        assert view.toMunch().users[1] == Munch(name="bob", tags=[])
+        with pytest.raises(TypeError):
+            view.users[0].name = "x"
+        with pytest.raises(KeyError):
+            view["missing"]  # pylint: disable=pointless-statement
+        del view
+
+        multiprocessing = pytest.importorskip("multiprocessing")
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+            queue = context.Queue()
+            process = context.Process(target=_read_shared, args=(shm.name, queue))
+            process.start()
+            assert queue.get(timeout=30) == ("bob", expected)
+            process.join()
+
+        # A process of its own, with its own resource tracker, reads the
+        # block without unlinking it when it exits
+        code = f"import munch; print(munch.Munch.open_shared_memory({shm.name!r}).users[1].name)"
+        result = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, check=True,
+                                env=dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(munch.__file__))))
+        assert result.stdout.strip() == b"bob"
+        time.sleep(0.2)  # for the resource tracker of that process, had it registered the block
+        assert Munch.open_shared_memory(shm.name).users[0].name == "ann"
+    finally:
+        shm.close()
+        shm.unlink()
+
+    with pytest.raises(TypeError):
+        Munch(a=object()).to_shared_memory()
+    cyclic = Munch()
+    cyclic.self = cyclic
+    with pytest.raises(ValueError):
+        cyclic.to_shared_memory()
+
+
+def test_mmap(tmp_path):
+    data = {"routes": [{"path": f"/r{i}", "weight": i / 2} for i in range(100)], "version": 10 ** 20}
+    path = tmp_path / "data.munch"
+    Munch.save_mmap(munchify(data), path)
+    view = Munch.open_mmap(str(path))
+    assert view.routes[42].path == "/r42" and view.routes[-1].weight == 49.5 and view.version == 10 ** 20
+    assert view.toDict() == data
+    del view
+    path.unlink()
+
+    path.write_bytes(b"not a packed file at all, but long enough" * 10)
+    with pytest.raises(ValueError):
+        Munch.open_mmap(path)
+
+
+def test_bytes():
+    data = {"users": [{"name": "ann", "tags": ("a", "b")}, {"name": "bo\u00e9 \ud83d", "tags": []}],
+            "big": -(10 ** 30), "blob": b"\x00\xff", 1: [None, True, 2.5], "empty": {}}
+    blob = Munch.fromDict(data).toBytes()
+    b = Munch.fromBytes(blob)
+    assert b.users[1].name == "bo\u00e9 \ud83d" and b.users[0].tags == ["a", "b"]
+    assert b.big == -(10 ** 30) and b.blob == b"\x00\xff" and b[1] == [None, True, 2.5]
+    assert type(b.users[0]) is Munch and type(b.empty) is Munch
+    assert Munch.fromBytes(memoryview(blob)) == b and Munch.fromBytes(Munch(a=1).toBytes()) == {"a": 1}
+
+    d = DefaultMunch.fromBytes(DefaultMunch.fromDict({"a": {"b": 1}}, default="?").toBytes())
+    assert d.a.missing == "?" and d.missing == "?"
+    nested = DefaultMunch("root", a=DefaultMunch("a", b=DefaultMunch([], c=1)), d=[DefaultMunch(None)])
+    d = DefaultMunch.fromBytes(nested.toBytes())
+    assert d.missing == "root" and d.a.missing == "a" and d.a.b.missing == []
+    assert d.d[0].missing is None and d == nested
+    assert DefaultMunch.fromBytes(blob, "!").users[0].missing == "!"
+    f = DefaultFactoryMunch.fromBytes(blob, list)
+    assert f.users[0].missing == [] and isinstance(f.users[1], DefaultFactoryMunch)
+    assert isinstance(RecursiveMunch.fromBytes(blob).nothing.here, RecursiveMunch)
+    with pytest.raises(TypeError, match="default_factory"):
+        DefaultFactoryMunch.fromBytes(DefaultFactoryMunch(list, a=1).toBytes())
+
+    t = TrackedMunch.fromBytes(blob)
+    assert t.changes() == []
+    t.users[0].name = "cy"
+    assert t.changes() == [("replace", ("users", 0, "name"))]
+
+    with pytest.raises(TypeError):
+        Munch(a=object()).toBytes()
+    with pytest.raises(ValueError):
+        Munch.fromBytes(b"not packed munch bytes" * 4)
+
+
+def test_bytes_values():
+    shared = {"x": [1, {"y": 2}]}
+    m = Munch(a=shared, b=shared, e=[[], [[1, {"z": None}]], ()], f=bytearray(b"ab"),
+              ints=[-1 << 63, (1 << 63) - 1, 1 << 64, -(1 << 70), 0], keys=[{True: 1}, {1: 1}, {1.0: 1}], empty={})
+    b = Munch.fromBytes(m.toBytes())
+    assert b.a == b.b == shared and b.a is not b.b and b.ints == m.ints and b["keys"] == m["keys"]
+    assert b.e == [[], [[1, {"z": None}]], []] and b.f == b"ab"
+    assert [type(next(iter(k))) for k in b["keys"]] == [bool, int, float]
+    assert type(b.e[1][0][1]) is Munch and type(b.empty) is Munch
+
+    looped = Munch(a=1)
+    looped.b = [looped]
+    with pytest.raises(ValueError, match="Circular"):
+        looped.toBytes()
+    with pytest.raises(TypeError, match="keys must be"):
+        Munch(a={(1, 2): 1}).toBytes()
+    blob = Munch(a="x").toBytes()
+    for bad in (blob[:-1], blob + b"\0"):
+        with pytest.raises(ValueError):
+            Munch.fromBytes(bad)
+
+
 def test_automunch():
     b = AutoMunch()
     b.urmom = {"sez": {"what": "what"}}
@@ -148,16 +418,700 @@ def test_fromDict():
     assert b.urmom.sez.what == "what"
 
 
+def test_intern_keys():
+    def key():
+        return "".join(["na", "me"])
+
+    def first_key(m):
+        return next(iter(m))
+
+    a = munchify({"rows": [{key(): 1}, {key(): 2}]}, intern_keys=True)
+    b = Munch.fromDict({key(): 3}, intern_keys=True)
+    assert first_key(a.rows[0]) is first_key(a.rows[1]) is first_key(b) is sys.intern("name")
+    assert first_key(munchify({key(): 1})) is not first_key(b)
+
+    number = int("1" * 30)
+    c = munchify({number: 1, b"raw": 2}, intern_keys=True)
+    d = munchify({int("1" * 30): 1, True: 2, bytes(b"raw"): 3}, intern_keys=True)
+    assert list(d) == [number, True, b"raw"]
+    assert list(d)[0] is first_key(c) is number
+    assert list(d)[1] is True
+    assert list(d)[2] is list(c)[1]
+
+    assert first_key(DefaultMunch.fromDict({key(): 1}, intern_keys=True)) is sys.intern("name")
+    assert first_key(RecursiveMunch.fromDict({key(): 1}, intern_keys=True)) is sys.intern("name")
+    assert first_key(munchify({key(): 1}, factory=Munch.schema("Named", ["name"]), intern_keys=True)) == "name"
+    with pytest.raises(TypeError):
+        munchify({}, lazy=True, intern_keys=True)
+
+    first = Munch.fromJSON('{"name": {"name": 1}}', intern_keys=True)
+    second = DefaultMunch.fromJSON(b'{"name": 2}', None, intern_keys=True)
+    assert first_key(first) is first_key(first.name) is first_key(second)
+    assert second.missing is None
+    lines = list(Munch.iter_jsonl(io.StringIO('{"name": 1}\n{"name": 2}\n'), intern_keys=True))
+    assert first_key(lines[0]) is first_key(lines[1]) is first_key(first)
+
+
+def test_splitnest_and_flatten():
+    flat = {"one.two": 1, "one.three": {"x": 2}, "two.one": [3], "top": 4, 5: "five", "a.b.c.d": None}
+    nested = splitnest(flat)
+    assert nested == {"one": {"two": 1, "three": {"x": 2}}, "two": {"one": [3]}, "top": 4, 5: "five",
+                      "a": {"b": {"c": {"d": None}}}}
+    assert nested["one"]["three"] is flat["one.three"]
+    assert splitnest({"a/b": 1, "a/c/d": 2}, sep="/") == {"a": {"b": 1, "c": {"d": 2}}}
+    assert splitnest({".".join(["k"] * 1000): 1})["k"]["k"]["k"] is not None
+
+    flat = {"one.two": 1, "one.three.x": 2, "two.one": [3], "top": 4, "a.b.c.d": None}
+    assert flatten(splitnest(flat)) == flat
+    assert flatten(Munch(a=Munch(b=1, c={}), d=[Munch(e=2)]), sep="__") == {"a__b": 1, "a__c": {}, "d": [Munch(e=2)]}
+    nested = {1: 2, 3: {"x": 4}, "a": {1: "x", "b": 5}, "c": {"d": {6: None}}, "e": {"f": 7}}
+    assert flatten(nested) == {1: 2, 3: {"x": 4}, "a": {1: "x", "b": 5}, "c.d": {6: None}, "e.f": 7}
+    assert splitnest(flatten(nested)) == nested
+
+    shared = {"x": 1}
+    b = munchify({"db.host": "h", "db.port": 1, "db.opts": shared, "raw": shared, "list": [shared]}, split=".")
+    assert b == {"db": {"host": "h", "port": 1, "opts": {"x": 1}}, "raw": {"x": 1}, "list": [{"x": 1}]}
+    assert type(b.db) is Munch and type(b.db.opts) is Munch  # pylint: disable=unidiomatic-typecheck
+    assert b.db.opts is b.raw is b.list[0]
+
+    d = DefaultMunch.fromDict({"a.b": 1}, "dflt", split=".")
+    assert d.a.b == 1 and d.a.missing == "dflt"
+    assert DefaultMunch.fromDict({"a.b": 1}, split=".").a.missing is None
+    assert RecursiveMunch.fromDict({"a.b": 1}, split=".").a.c == RecursiveMunch()
+    assert Munch.fromDict({"a:b": 1}, split=":").a.b == 1
+    assert munchify({"a.b": 1}, factory=lambda d_: DefaultMunch(0, d_), split=".").a.z == 0
+    with pytest.raises(TypeError):
+        munchify([{"a.b": 1}], split=".")
+
+    # a key that is both a non-mapping value and a prefix: the later one wins
+    for flat, expected in (
+        ({"a": 1, "a.b": 2}, {"a": {"b": 2}}),
+        ({"a.b": 2, "a": 1}, {"a": 1}),
+        ({"a.b.c": 1, "a.b": 2, "a.b.d": 3, "a.e": 4}, {"a": {"b": {"d": 3}, "e": 4}}),
+        ({"a.b": 2, "a": {"x": 0}}, {"a": {"x": 0}}),
+    ):
+        assert splitnest(flat) == munchify(flat, split=".") == expected
+
+    # dotted keys below a mapping value are merged into a copy of it
+    kept = {"x": 0, "y": {"z": 1}}
+    for flat, expected in (
+        ({"a": {"c": 2}, "a.b": 1}, {"a": {"c": 2, "b": 1}}),
+        ({"a": kept, "a.x": 5, "a.y.w": 2}, {"a": {"x": 5, "y": {"z": 1, "w": 2}}}),
+        ({"a": kept, "a.y": 3, "a.y.w": 2}, {"a": {"x": 0, "y": {"w": 2}}}),
+    ):
+        assert splitnest(flat) == munchify(flat, split=".") == expected
+    assert kept == {"x": 0, "y": {"z": 1}}
+    assert type(munchify({"a": kept, "a.y.w": 2}, split=".").a.y) is Munch  # pylint: disable=unidiomatic-typecheck
+
+
+def test_get_path():
+    b = Munch.fromDict({"a": {"b": [{"c": 1}, {"c": 2}], "d.e": {"f": 3}}, "t": (10, 20)})
+    assert b.get_path("a.b[1].c") == 2
+    assert b.get_path("a.b[-2].c") == 1
+    assert b.get_path("a['d.e'].f") == b.get_path('a["d.e"]["f"]') == 3
+    assert b.get_path(("a", "d.e", "f")) == 3
+    assert b.get_path("t[1]") == 20
+    assert b.get_path("") is b
+    for missing in ("x", "a.x.c", "a.b[2].c", "a.b[-3]", "a.b.c", "t[0].x", "a.b[0].c.d"):
+        assert b.get_path(missing) is None
+        assert b.get_path(missing, "dflt") == "dflt"
+    for invalid in ("a..b", "a[", "a[x]", "a.b[1]c"):
+        with pytest.raises(ValueError):
+            b.get_path(invalid)
+
+    d = DefaultMunch.fromDict({"a": {"b": 1}}, "undefined")
+    assert d.get_path("a.b") == 1 and d.get_path("a.x") is None
+    r = RecursiveMunch()
+    assert r.get_path("a.b", 0) == 0 and r == {}
+
+
+def test_set_path():
+    b = Munch()
+    b.set_path("a.b.c", 1)
+    b.set_path("a.list", [{"x": 1}])
+    b.set_path("a.list[0].y", 2)
+    b.set_path("a.list[-1]['z.z']", 3)
+    assert b == {"a": {"b": {"c": 1}, "list": [{"x": 1, "y": 2, "z.z": 3}]}}
+    assert type(b.a.b) is Munch  # pylint: disable=unidiomatic-typecheck
+    with pytest.raises(KeyError):
+        b.set_path("a.x.y", 1, create=False)
+    with pytest.raises(IndexError):
+        b.set_path("a.list[5].x", 1)
+    with pytest.raises(KeyError):
+        b.set_path("a.x[0].y", 1)
+    with pytest.raises(KeyError):
+        b.set_path("a.x[0]", 1)
+    assert "x" not in b.a
+    with pytest.raises(ValueError):
+        b.set_path("", 1)
+
+    d = DefaultMunch("dflt")
+    d.set_path("a.b", 1)
+    assert type(d.a) is DefaultMunch and d.a.missing == "dflt"  # pylint: disable=unidiomatic-typecheck
+    f = DefaultFactoryMunch(list)
+    f.set_path("a.b", 1)
+    assert f.a.missing == []
+    r = RecursiveMunch()
+    r.set_path("a.b.c", 1)
+    assert r.a.b.c == 1 and r.a.new == RecursiveMunch()
+
+    b.del_path("a.list[0].x")
+    b.del_path(["a", "b"])
+    assert b == {"a": {"list": [{"y": 2, "z.z": 3}]}}
+    with pytest.raises(KeyError):
+        b.del_path("a.missing.x")
+    with pytest.raises(KeyError):
+        b.del_path("a.missing")
+    with pytest.raises(IndexError):
+        b.del_path("a.list[3]")
+
+
+def test_compile_query():
+    data = Munch.fromDict({
+        "items": [
+            {"id": 1, "owner": {"id": "ann"}, "price": 5, "tags": ["a", "b"]},
+            {"id": 2, "owner": {"id": "bob"}, "price": 15, "tags": []},
+            {"id": 3, "price": None},
+            "not a mapping",
+        ],
+        "by.name": {"x": {"n": 1}, "y": {"n": 2}},
+    })
+    q = compile_query("items[*].owner.id")
+    assert q(data) == ["ann", "bob"]
+    assert compile_query("items[*].owner.id") is q
+    assert q.expression == "items[*].owner.id"
+
+    assert compile_query("['by.name'].*.n")(data) == [1, 2]
+    assert compile_query("['by.name'][*]")(data) == [{"n": 1}, {"n": 2}]
+    assert compile_query("items[1:3].id")(data) == [2, 3]
+    assert compile_query("items[::-2]")(data)[0] == "not a mapping"
+    assert compile_query("items[-4].tags[0]")(data) == ["a"]
+    assert compile_query("items[*].tags[*]")(data) == ["a", "b"]
+    assert compile_query("items[?price > 10].id")(data) == [2]
+    assert compile_query("items[?@.price <= 5].id")(data) == [1]  # None < 5 is skipped
+    assert compile_query("items[?price == null].id")(data) == [3]
+    assert compile_query("items[?owner.id != 'ann'].id")(data) == [2]
+    assert compile_query('items[?owner].owner.id')(data) == ["ann", "bob"]
+    assert compile_query("items[*].tags[?@ == 'b']")(data) == ["b"]
+    assert compile_query("items[9].id")(data) == []
+    assert compile_query("missing[*].x")(data) == []
+    assert compile_query("items[0].id")({"items": {"0": 1}}) == []
+
+    # filter paths with indices, quoted brackets and filters of their own
+    assert compile_query("items[?tags[0] == 'a'].id")(data) == [1]
+    assert compile_query("items[?tags[1]].id")(data) == [1]
+    assert compile_query("items[?tags[?@ == 'b']].id")(data) == [1]
+    assert compile_query("items[?tags[*] != 'a'].id")(data) == [1]
+    assert compile_query("rows[?['k]'] == 'x]'].n")({"rows": [{"k]": "x]", "n": 1}, {"k]": "y", "n": 2}]}) == [1]
+
+    for invalid in ("items[x]", "items[?price ~ 1]", "items[?price == maybe]", "items..id",
+                    "items[?tags[0 == 'a']", "items[? == 1]"):
+        with pytest.raises(ValueError):
+            compile_query(invalid)
+
+    records = [{"tags": ["a", "b"]}, {"tags": []}, {"tags": ["c"]}]
+    assert query_many(records, "tags[*]") == [["a", "b"], [], ["c"]]
+    assert query_many(records, compile_query("tags[0]"), flat=True) == ["a", "c"]
+
+
+def test_from_records():
+    key = "".join(["na", "me"])
+    rows = [(1, "ann"), (2, "bob")]
+    result = Munch.from_records(rows, keys=("id", key))
+    assert result == [Munch(id=1, name="ann"), Munch(id=2, name="bob")]
+    assert all(type(m) is Munch for m in result)  # pylint: disable=unidiomatic-typecheck
+    first_keys = list(result[0])
+    assert first_keys[1] is list(result[1])[1] is sys.intern("name")
+
+    dict_rows = [{"id": i, key: str(i)} for i in range(3)] + [{"other": 1}]
+    result = DefaultMunch.from_records(dict_rows, "default")
+    assert result[2] == {"id": 2, "name": "2"}
+    assert result[3].other == 1 and result[3].id == "default"
+    assert list(result[0])[1] is list(result[2])[1]
+
+    class DoublingMunch(Munch):
+        def __setitem__(self, k, v):
+            super().__setitem__(k, [v] * 2)
+
+    assert DoublingMunch.from_records([(1,)], keys=("a",))[0].a == [1, 1]
+
+    for cls in (Munch, TrackedMunch):
+        result = cls.from_records([{"a": 1, "b": 2, "c": 3}], keys=("b", "a"))
+        assert result == [{"b": 2, "a": 1}] and list(result[0]) == ["b", "a"]
+        with pytest.raises(KeyError):
+            cls.from_records([{"a": 1}], keys=("a", "b"))
+        for row in ((1,), (1, 2, 3)):
+            with pytest.raises(ValueError):
+                cls.from_records([row], keys=("a", "b"))
+
+
+def test_schema():
+    User = Munch.schema("User", ["id", "name", "email"])
+    assert Munch.schema("User", ("id", "name", "email")) is User
+    assert issubclass(User, SchemaMunch) and issubclass(User, Mapping)
+
+    u = User({"id": 1}, name="ann")
+    assert (u.id, u.name, u.email) == (1, "ann", None)
+    assert u == {"id": 1, "name": "ann", "email": None}
+    assert list(u) == ["id", "name", "email"] and len(u) == 3
+    assert "name" in u and "nickname" not in u
+    assert u.get("nickname", 42) == 42
+    assert not hasattr(u, "__dict__")
+
+    u.email = "ann@example.com"
+    u["id"] = 2
+    assert u.toDict() == {"id": 2, "name": "ann", "email": "ann@example.com"}
+    with pytest.raises(KeyError):
+        u["nickname"] = "a"
+    with pytest.raises(AttributeError):
+        u.nickname = "a"
+
+    restored = pickle.loads(pickle.dumps(u))
+    assert type(restored) is User and restored == u  # pylint: disable=unidiomatic-typecheck
+
+    assert json.loads(u.toJSON()) == u.toDict()
+    assert json.loads(Munch(user=u).toJSON()) == {"user": u.toDict()}
+
+    users = munchify([{"id": 1, "name": "a", "email": None}, {"id": 2}], factory=User)
+    assert [type(x) for x in users] == [User, User]
+    assert users[1].name is None
+    nested = munchify([{"id": 1, "name": {"first": "a"}}, [({"id": 2},)]], factory=User)
+    assert type(nested[0]) is User and type(nested[0].name) is Munch  # pylint: disable=unidiomatic-typecheck
+    assert nested[0].name.first == "a" and type(nested[1][0][0]) is User  # pylint: disable=unidiomatic-typecheck
+    assert nested[0] == User.fromDict({"id": 1, "name": {"first": "a"}})
+    assert munchify({"id": 3, "name": {"first": "b"}}, factory=User).name.first == "b"
+
+    for bad in (["items"], ["not valid"], ["a", "a"]):
+        with pytest.raises(ValueError):
+            Munch.schema("Bad", bad)
+
+
+@pytest.mark.usefixtures("yaml")
+def test_schema_yaml():
+    Point = Munch.schema("Point", ["x", "y"])
+    p = Point(x=1, y=2)
+    assert p.toYAML() == "x: 1\ny: 2\n"
+    assert Munch(p=p).toYAML(default_flow_style=True) == "{p: {x: 1, y: 2}}\n"
+
+
+def test_munch_table():
+    rows = [Munch(sku="a", price=2.5, qty=2), {"sku": "b", "price": 4, "qty": 1}, {"sku": "c", "note": "x"}]
+    table = MunchTable.from_rows(rows)
+    assert len(table) == 3 and list(table.columns) == ["sku", "price", "qty", "note"]
+    assert table.sku == ["a", "b", "c"] and table["note"] == [None, None, "x"]
+    assert table.price == [2.5, 4, None]  # None keeps the column a list
+
+    table = MunchTable.from_rows(rows[:2])
+    assert table.price == array.array("d", [2.5, 4.0])
+    assert table.qty == array.array("q", [2, 1])
+    assert sum(table.price) == 6.5
+
+    row = table[-1]
+    assert isinstance(row, Mapping) and row == {"sku": "b", "price": 4.0, "qty": 1}
+    assert row.sku == "b" and "qty" in row and dir(row) == ["price", "qty", "sku"]
+    with pytest.raises(AttributeError):
+        row.missing  # pylint: disable=pointless-statement
+    with pytest.raises(IndexError):
+        table[2]  # pylint: disable=pointless-statement
+
+    row.qty = 7
+    table[0]["price"] = 3
+    assert table.qty == array.array("q", [2, 7]) and table.price == array.array("d", [3.0, 4.0])
+    row.qty = "many"
+    assert table.qty == [2, "many"]
+    table.append({"sku": "d", "price": 1.25, "qty": 1, "tags": ["x"]})
+    assert table.price == array.array("d", [3.0, 4.0, 1.25]) and table.tags == [None, None, ["x"]]
+    table.append({"sku": "e", "price": 2 ** 60})
+    assert table.price == [3.0, 4.0, 1.25, 2 ** 60]
+
+    assert [r.sku for r in table[1:3]] == ["b", "d"]
+    assert MunchTable({"x": [1, 2**70]}).x == [1, 2**70]
+    with pytest.raises(ValueError):
+        MunchTable({"x": [1], "y": [1, 2]})
+
+    table = MunchTable.from_rows([{"id": 1, "owner": {"name": "ann"}}])
+    munches = table.to_munches()
+    assert munches == [Munch(id=1, owner=Munch(name="ann"))] and type(munches[0].owner) is Munch  # pylint: disable=unidiomatic-typecheck
+    dicts = table.to_dicts()
+    assert dicts == [{"id": 1, "owner": {"name": "ann"}}] and type(dicts[0]) is dict  # pylint: disable=unidiomatic-typecheck
+    assert table[0].toMunch().owner.name == "ann"
+    restored = pickle.loads(pickle.dumps(table))
+    assert restored.id == array.array("q", [1]) and restored.to_dicts() == dicts
+
+    table = MunchTable()
+    table.append({"id": 1, "price": 2.5, "sku": "a"})
+    table.append({"id": 2, "price": 3, "sku": "b"})
+    assert table.id == array.array("q", [1, 2]) and table.price == array.array("d", [2.5, 3.0])
+    assert table.sku == ["a", "b"]
+    sliced = table[:1]
+    sliced[0].id = 5
+    assert table.id[0] == 1
+
+
+def test_munch_table_numpy():
+    np = pytest.importorskip("numpy")
+    table = MunchTable({"price": [1.5, 2.5], "qty": [1, 2], "sku": ["a", "b"]}, numpy=True)
+    assert isinstance(table.price, np.ndarray) and table.price.dtype == np.float64
+    assert (table.price * table.qty).sum() == 6.5
+    table.append({"price": 1.0, "qty": 3, "sku": "c"})
+    assert table.qty.tolist() == [1, 2, 3]
+    assert table.to_dicts()[2] == {"price": 1.0, "qty": 3, "sku": "c"}
+
+    for i in range(1000):
+        table.append({"price": 0.5, "qty": i, "sku": "d"})
+    assert len(table) == len(table.qty) == 1003 and table.qty[-1] == 999
+    assert table.qty.base is not None and len(table.qty.base) < 2 * 1003
+    table[1].qty = 7
+    assert table.qty[1] == 7 and table[:2].qty.tolist() == [1, 7]
+    sliced = table[:2]
+    sliced.append({"price": 1.0, "qty": 8, "sku": "e"})
+    assert sliced.qty.tolist() == [1, 7, 8] and table.qty[2] == 3
+    sliced[0].qty = 9
+    assert table.qty[0] == 1
+
+    table.append({"price": np.float64(2.0), "qty": table.qty[0], "sku": "f"})
+    assert table.qty.dtype == np.int64 and table.price.dtype == np.float64
+    assert table.to_dicts()[-1] == {"price": 2.0, "qty": 1, "sku": "f"}
+
+    table = MunchTable(numpy=True)
+    for i in range(3):
+        table.append({"qty": np.int64(i), "sku": "x"})
+    assert isinstance(table.qty, np.ndarray) and table.qty.tolist() == [0, 1, 2]
+
+
+def test_cached_munch():
+    b = CachedMunch.fromDict({
+        "flags": {"beta": True},
+        "routes": {"a": {"rps": 1}, "b": {"rps": 2}},
+        "hosts": [{"name": "x"}],
+    })
+    assert type(b.routes.a) is CachedMunch  # pylint: disable=unidiomatic-typecheck
+    d = b.toDict()
+    assert d == {"flags": {"beta": True}, "routes": {"a": {"rps": 1}, "b": {"rps": 2}}, "hosts": [{"name": "x"}]}
+    assert type(d["routes"]) is dict  # pylint: disable=unidiomatic-typecheck
+    assert b.toDict() is d and b.__dict__ is d and vars(b) is d
+
+    b.routes.a.rps = 5
+    d2 = b.toDict()
+    assert d2 is not d and d2["routes"]["a"] == {"rps": 5}
+    assert d2["routes"]["b"] is d["routes"]["b"] and d2["flags"] is d["flags"]
+
+    # CachedMunches inside lists invalidate the node holding the list
+    b.hosts[0].name = "y"
+    assert b.toDict()["hosts"] == [{"name": "y"}]
+
+    mutations = [
+        lambda: b.routes.update(c={"rps": 3}),
+        lambda: b.routes.pop("c"),
+        lambda: b.flags.setdefault("new", 1),
+        lambda: b.flags.__delitem__("new"),
+        lambda: delattr(b.flags, "beta"),
+        lambda: b.routes.a.popitem(),
+        lambda: b.routes.b.clear(),
+        lambda: b.routes.__ior__({"z": 0}),
+    ]
+    for mutate in mutations:
+        before = b.toDict()
+        mutate()
+        assert b.toDict() is not before
+        assert b.toDict() == unmunchify(dict(b))
+
+    shared = CachedMunch(x=1)
+    c = CachedMunch(one=shared, two=CachedMunch(inner=shared))
+    assert c.toDict() == {"one": {"x": 1}, "two": {"inner": {"x": 1}}}
+    shared.x = 2
+    assert c.toDict() == {"one": {"x": 2}, "two": {"inner": {"x": 2}}}
+
+    cyclic = CachedMunch(a=1)
+    cyclic.self = cyclic
+    d = cyclic.toDict()
+    assert d["self"] is d and cyclic._munch_cache is None  # pylint: disable=protected-access
+
+    restored = pickle.loads(pickle.dumps(b))
+    assert type(restored) is CachedMunch and restored.toDict() == b.toDict()  # pylint: disable=unidiomatic-typecheck
+    copied = copy.copy(b)
+    copied.extra = 1
+    assert "extra" in copied.toDict() and "extra" not in b.toDict()
+
+
+def test_cached_munch_json():
+    b = CachedMunch.fromDict({
+        "flags": {"beta": True, "ratio": 0.5},
+        "routes": {"a": {"rps": 1}, "b": {"rps": 2, "tags": ("x", None)}},
+        "hosts": [{"name": "h\u00e9"}],
+        1: "one",
+    })
+    for options in ({}, {"sort_keys": False, "ensure_ascii": False}, {"separators": (",", ":")}, {"indent": 2}):
+        assert b.toJSON(**options) == json.dumps(b, **options)
+    text = b.toJSON()
+    assert b.toJSON() is text
+    routes_text = b.routes._munch_json[1]  # pylint: disable=protected-access
+
+    b.flags.beta = False
+    assert b.toJSON() == json.dumps(b)
+    assert b.routes._munch_json[1] is routes_text  # pylint: disable=protected-access
+    b.hosts[0].name = "y"
+    assert b.toJSON() == json.dumps(b)
+    b.routes.pop("b")
+    assert b.toJSON() == json.dumps(b)
+
+    # plain Munches and dicts in between still reach the enclosing CachedMunch
+    inner = CachedMunch(x=1)
+    b.flags.more = Munch(inner=inner)
+    assert b.toJSON() == json.dumps(b)
+    inner.x = 2
+    assert '"inner": {"x": 2}' in b.toJSON()
+
+    # other options re-encode, and forget the text kept for the previous ones
+    del b[1]
+    assert b.toJSON(sort_keys=True) == json.dumps(b, sort_keys=True)
+    assert b.toJSON() == json.dumps(b)
+
+    with pytest.raises(TypeError):
+        CachedMunch(a=object()).toJSON()
+    assert CachedMunch(a=b"x").toJSON(default=bytes.decode) == '{"a": "x"}'
+    assert CachedMunch({(1, 2): 1, "a": 2}).toJSON(skipkeys=True) == '{"a": 2}'
+
+    cyclic = CachedMunch(a=1)
+    cyclic.self = cyclic
+    with pytest.raises(ValueError):
+        cyclic.toJSON()
+    assert cyclic._munch_json is None  # pylint: disable=protected-access
+
+    child = CachedMunch(x=1)
+    first = CachedMunch(child=child)
+    first.toJSON()
+    del first
+    second = CachedMunch(child=child)  # usually gets the id of first
+    second.toJSON()
+    child.x = 2
+    assert second.toJSON() == '{"child": {"x": 2}}'
+
+
+def test_cached_munch_json_many_changes():
+    b = CachedMunch.fromDict({f"k{i}": {"v": i} for i in range(100)})
+    b.toJSON()
+    for i in range(50):
+        b[f"k{i}"].v = -i
+    # too many changes: encoded by json.dumps, without rebuilding the caches
+    assert b.toJSON() == json.dumps(b)
+    assert b._munch_json is None and b.k0._munch_json is None  # pylint: disable=protected-access
+    b.k99.v = 0
+    assert b.toJSON() == json.dumps(b)
+    # few changes since the previous call: the caches are built again
+    assert b.k0._munch_json[1] == '{"v": 0}' and b.toJSON() is b.toJSON()  # pylint: disable=protected-access
+
+
+def test_tracked_munch():
+    initial = {"users": [{"name": "ann", "roles": ["a"]}], "tick": 0, "cfg": {"x": {"y": 1}}}
+    state = TrackedMunch.fromDict(initial)
+    assert state.changes() == [] and TrackedMunch(a=1).changes() == []
+    assert isinstance(state.users[0], TrackedMunch) and isinstance(state.users[0].roles, list)
+
+    state.tick = 1
+    state.users[0].name = "bob"
+    state.users[0].roles.append("b")
+    state.users.append({"name": "cy", "roles": []})
+    state.users[1].roles.append("c")  # folded into adding users/1
+    state.cfg.x.y = 2
+    state.cfg.x = {"z": 3}  # replaces the change to cfg/x/y
+    state.cfg.x.z = 4
+    state["a/b~c"] = True
+    state.tmp = 1
+    del state.tmp  # added and removed: nothing to send
+    assert state.changes() == [
+        ("replace", ("tick",)),
+        ("replace", ("users", 0, "name")),
+        ("add", ("users", 0, "roles", 1)),
+        ("add", ("users", 1)),
+        ("replace", ("cfg", "x")),
+        ("add", ("a/b~c",)),
+    ]
+    patch = state.to_json_patch()
+    assert patch[-1] == {"op": "add", "path": "/a~1b~0c", "value": True}
+    assert patch[3] == {"op": "add", "path": "/users/1", "value": {"name": "cy", "roles": ["c"]}}
+    assert state.users[0].changes() == [("replace", ("name",)), ("add", ("roles", 1))]
+
+    replica = Munch.fromDict(initial)
+    assert replica.apply_patch(json.loads(json.dumps(patch))) == state
+    assert type(replica.cfg.x) is Munch  # pylint: disable=unidiomatic-typecheck
+
+    state.users[0].clear_changes()
+    assert ("replace", ("users", 0, "name")) not in state.changes()
+    state.clear_changes()
+    assert state.changes() == []
+
+    users = state.users
+    users.pop()
+    users.insert(0, {"name": "new"})
+    users[1].name = "ann"
+    assert state.changes() == [("replace", ("users",))]
+    state.clear_changes()
+    users.sort(key=lambda u: u["name"])
+    assert users[0].name == "ann" and state.changes() == [("replace", ("users",))]
+    state.clear_changes()
+
+    removed = state.cfg
+    del state.cfg
+    removed.x.z = 5  # detached: no longer part of state
+    assert state.changes() == [("remove", ("cfg",))]
+    assert removed.changes() == [("replace", ("x", "z"))]
+
+    restored = pickle.loads(pickle.dumps(state))
+    assert restored == state and restored.changes() == []
+    restored.users[0].name = "zed"
+    assert restored.changes() == [("replace", ("users", 0, "name"))]
+    loaded = TrackedMunch.fromJSON('{"rows": [{"n": 1}]}')
+    loaded.rows[0].n = 2
+    assert loaded.to_json_patch() == [{"op": "replace", "path": "/rows/0/n", "value": 2}]
+
+    built = munchify({"a": {"b": 0}}, TrackedMunch)
+    built.a.b = 1
+    assert built.changes() == [("replace", ("a", "b"))]
+    rows = munchify([{"a": {"b": 0}}, ({"a": {}},)], TrackedMunch)
+    rows[0].a.b = 1
+    rows[1][0].a.c = 2
+    assert rows[0].changes() == [("replace", ("a", "b"))]
+    assert rows[1][0].changes() == [("add", ("a", "c"))]
+
+
+def test_tracked_munch_copies():
+    initial = {"users": [{"name": "ann"}], "a": {"b": 1}}
+    state = TrackedMunch.fromDict(initial)
+    assert state.toDict() == unmunchify(state) == initial
+    assert type(unmunchify(state)["users"]) is list  # pylint: disable=unidiomatic-typecheck
+    assert Munch.fromDict(state).users[0].name == "ann"
+
+    state.users.insert(0, {"name": "bo"})
+    assert state.to_json_patch() == [{"op": "replace", "path": "/users", "value": [{"name": "bo"}, {"name": "ann"}]}]
+    assert Munch.fromDict(initial).apply_patch(state.to_json_patch()) == state
+    state.clear_changes()
+
+    copied = copy.deepcopy(state)
+    assert copied == state and copied.changes() == []
+    copied.a.b = 9
+    copied.users[1].name = "cy"
+    assert copied.changes() == [("replace", ("a", "b")), ("replace", ("users", 1, "name"))]
+    assert state.changes() == [] and state.a.b == 1
+
+    # nodes of another tree are copied, not moved out of it
+    other = TrackedMunch()
+    other.a = state.a
+    other.users = state.users
+    other.first = state.users[0]
+    assert other.a is not state.a and other.users[0] is not state.users[0]
+    assert other.first is not state.users[0] and other.first == state.users[0]
+    state.a.b = 2
+    assert state.changes() == [("replace", ("a", "b"))] and other.a.b == 1
+    other.clear_changes()
+    other.users[0].name = "di"
+    assert other.changes() == [("replace", ("users", 0, "name"))] and state.users[0].name == "bo"
+    moved = state.pop("a")
+    other.moved = moved
+    assert other.moved is moved
+    assert type(state.users).sort.__name__ == "sort"
+
+
+def test_apply_patch():
+    b = DefaultMunch.fromDict({"a": {"b": 1}, "list": [1, 2], "n": {"0": "str key"}}, "dflt")
+    b.apply_patch([
+        {"op": "add", "path": "/new", "value": {"deep": {}}},
+        {"op": "test", "path": "/a/b", "value": 1},
+        {"op": "copy", "from": "/a", "path": "/a2"},
+        {"op": "move", "from": "/a/b", "path": "/list/0"},
+        {"op": "add", "path": "/list/-", "value": 3},
+        {"op": "remove", "path": "/list/1"},
+        {"op": "replace", "path": "/n/0", "value": "replaced"},
+    ])
+    assert b == {"a": {}, "a2": {"b": 1}, "list": [1, 2, 3], "n": {"0": "replaced"}, "new": {"deep": {}}}
+    assert b.new.deep.missing == "dflt" and b.a2 is not b.a
+    with pytest.raises(ValueError):
+        b.apply_patch([{"op": "test", "path": "/a2/b", "value": 2}])
+    with pytest.raises(KeyError):
+        b.apply_patch([{"op": "replace", "path": "/nothing", "value": 2}])
+    with pytest.raises(ValueError):
+        b.apply_patch([{"op": "frobnicate", "path": "/a", "value": 2}])
+
+    b = Munch(l=[1, 2])
+    for path in ("/l/3", "/l/-1", "/l/01", "/l/+1", "/l/x"):
+        with pytest.raises(IndexError):
+            b.apply_patch([{"op": "add", "path": path, "value": 0}])
+    with pytest.raises(IndexError):
+        b.apply_patch([{"op": "remove", "path": "/l/-1"}])
+    assert b.apply_patch([{"op": "add", "path": "/l/2", "value": 3}]) == {"l": [1, 2, 3]}
+
+
 def test_copy():
     m = Munch(urmom=Munch(sez=Munch(what="what")))
     c = m.copy()
     assert c is not m
+    assert type(c) is Munch  # pylint: disable=unidiomatic-typecheck
+    assert c.urmom is m.urmom
+    assert c == m
+    assert copy.copy(m) == m and copy.copy(m).urmom is m.urmom
+
+
+def test_deep_copy():
+    m = Munch(urmom=Munch(sez=Munch(what="what")))
+    c = m.deep_copy()
+    assert c is not m
     assert c.urmom is not m.urmom
     assert c.urmom.sez is not m.urmom.sez
     assert c.urmom.sez.what == "what"
     assert c == m
 
 
+def test_deepcopy():
+    leaf = ["mutable"]
+    m = DefaultMunch("default", a=Munch(b=leaf, c=(leaf, 1)), d="str")
+    m.a.self = m
+    c = copy.deepcopy(m)
+    assert type(c) is DefaultMunch and type(c.a) is Munch  # pylint: disable=unidiomatic-typecheck
+    assert c.a is not m.a
+    assert c.a.b == leaf and c.a.b is not leaf
+    assert c.a.c[0] is c.a.b
+    assert c.a.self is c
+    assert c.missing == "default"
+
+    m = DefaultMunch([], a=DefaultMunch([]))
+    m.a.__default__ = m.__default__
+    c = copy.deepcopy(m)
+    assert c.missing == [] and c.__default__ is not m.__default__
+    assert c.a.__default__ is c.__default__  # shared in the copy as in the original
+
+    f = DefaultFactoryMunch(list, a=[1])
+    c = copy.deepcopy(f)
+    assert c.a == [1] and c.a is not f.a
+    assert c.default_factory is list
+
+
+class SlottedMunch(Munch):
+    __slots__ = ("label", "__hidden")
+
+
+def test_copy_subclass_state():
+    tagged = TaggedMunch(a=[1])
+    object.__setattr__(tagged, "tag", ["t"])
+    for c in (tagged.copy(), copy.copy(tagged), copy.deepcopy(tagged)):
+        assert type(c) is TaggedMunch and c == tagged  # pylint: disable=unidiomatic-typecheck
+        assert c.tag == ["t"]
+    assert copy.copy(tagged).a is tagged.a
+    assert copy.deepcopy(tagged).tag is not tagged.tag
+
+    b = Munch(a=1)
+    object.__setattr__(b, "extra", ["x"])
+    assert b.copy().extra is b.extra
+    assert copy.deepcopy(b).extra == ["x"] and copy.deepcopy(b).extra is not b.extra
+
+    s = SlottedMunch(a=1)
+    object.__setattr__(s, "label", ["l"])
+    object.__setattr__(s, "_SlottedMunch__hidden", "h")
+    for c in (copy.copy(s), copy.deepcopy(s)):
+        assert c == s and c.label == ["l"] and c._SlottedMunch__hidden == "h"  # pylint: disable=protected-access
+    assert copy.deepcopy(s).label is not s.label
+    assert not hasattr(copy.copy(SlottedMunch()), "label")
+
+
 def test_munchify():
     b = munchify({"urmom": {"sez": {"what": "what"}}})
     assert b.urmom.sez.what == "what"
@@ -193,6 +1147,181 @@ def test_munchify_with_namedtuple():
     assert b.top.middle.prop_b.leaf == "should be munchified"
 
 
+def test_munchify_lazy():
+    nt = namedtuple("nt", ["prop_a", "prop_b"])
+    data = {
+        "user": {"name": "ann", "roles": [{"id": 1}, [{"id": 2}]]},
+        "pair": nt({"a": 1}, 2),
+        "untouched": {"deep": {"deeper": {}}},
+        "n": 3,
+    }
+    b = munchify(data, lazy=True)
+    assert type(b) is LazyMunch  # pylint: disable=unidiomatic-typecheck
+    assert dict.__getitem__(b, "user") is data["user"]
+
+    assert b.user.name == "ann"
+    assert b.user is b["user"]
+    assert type(dict.__getitem__(b, "user")) is LazyMunch  # pylint: disable=unidiomatic-typecheck
+    assert b.user.roles[0].id == 1
+    assert b.user.roles[1][0].id == 2
+    assert b.pair.prop_a.a == 1
+    assert type(dict.__getitem__(b, "untouched")) is dict  # pylint: disable=unidiomatic-typecheck
+    assert data["user"] == {"name": "ann", "roles": [{"id": 1}, [{"id": 2}]]}
+
+    assert b == munchify(data)
+    assert unmunchify(b) == data
+    assert b.get("untouched").deep.deeper == LazyMunch()
+    assert all(isinstance(v, LazyMunch) for v in b.values() if isinstance(v, Mapping))
+    assert isinstance(b.pop("untouched"), LazyMunch)
+    assert isinstance(LazyMunch.fromDict({"a": {"b": 1}}).a, LazyMunch)
+    for option in ({"intern_keys": True}, {"split": "."}):
+        with pytest.raises(TypeError):
+            LazyMunch.fromDict({"a.b": 1}, **option)
+
+    with pytest.raises(TypeError):
+        munchify(data, DefaultMunch, lazy=True)
+
+
+def test_lazy_munch_copies():
+    lm = LazyMunch({"a": {"b": [{"c": 1}]}, "n": 1})
+    assert lm.a.b[0].c == 1
+    for other in (lm.deep_copy(), copy.deepcopy(lm), LazyMunch.fromDict(lm)):
+        assert other is not lm and type(other) is LazyMunch  # pylint: disable=unidiomatic-typecheck
+        assert other == lm and other.a is not lm.a
+    copied = lm.deep_copy()
+    lm.a.b[0].c = 2
+    lm.n = 3
+    assert copied.a.b[0].c == 1 and copied.n == 1
+
+    m = Munch(a=Munch(b=1))
+    lazy = munchify(m, lazy=True)
+    assert lazy is not m and type(lazy) is LazyMunch  # pylint: disable=unidiomatic-typecheck
+    assert type(lazy.a) is LazyMunch and lazy.a is not m.a  # pylint: disable=unidiomatic-typecheck
+
+
+def test_munch_view():
+    data = {"a": {"b": {"c": 1}}, "rows": [{"x": 2}, ({"y": 3},)], "n": None}
+    view = MunchView(data)
+    assert view.a.b.c == 1
+    assert view["a"]["b"]["c"] == 1
+    assert view.rows[0].x == 2
+    assert view.rows[1][0].y == 3
+    assert view.rows[:1][0].x == 2
+    assert len(view.rows) == 2
+    assert view.n is None
+    assert sorted(view) == ["a", "n", "rows"]
+    assert view.get("missing", 42) == 42
+    assert view == data
+    assert view.a == MunchView(data["a"])
+    assert dir(view) == ["a", "n", "rows"]
+
+    with pytest.raises(AttributeError):
+        view.missing  # pylint: disable=pointless-statement
+    with pytest.raises(TypeError):
+        view.a = 1
+    with pytest.raises(TypeError):
+        view["a"] = 1  # pylint: disable=unsupported-assignment-operation
+    with pytest.raises(TypeError):
+        del view.a
+    with pytest.raises(TypeError):
+        view.rows[0] = 1  # pylint: disable=unsupported-assignment-operation
+    assert not hasattr(view, "__dict__")
+    with pytest.raises(TypeError):
+        del view.rows.count
+    for target in (view, view.a, view.rows):
+        assert not hasattr(target, "_mapping") and not hasattr(target, "_sequence")
+    assert MunchView({"_mapping": 1})._mapping == 1  # pylint: disable=protected-access
+
+    data["a"]["b"]["c"] = 5
+    assert view.a.b.c == 5
+
+    copied = view.toMunch()
+    assert copied.a.b.c == 5 and isinstance(copied.a, Munch)
+    assert view.toDict() == data and view.toDict()["a"] is not data["a"]
+    assert pickle.loads(pickle.dumps(view)) == view
+
+    for target, source in ((view, data), (view.rows, data["rows"])):
+        args = target.__reduce__()[1][0]
+        assert args == source and args is not source
+    assert view.__reduce__()[1][0]["a"] is not data["a"]
+    assert pickle.loads(pickle.dumps(view.rows)) == view.rows
+    with pytest.raises(TypeError):
+        view.__init__({"other": 1})
+    with pytest.raises(TypeError):
+        view.rows.__init__([])
+    assert view == data
+
+
+def test_register_converter():
+    @dataclasses.dataclass
+    class Point:
+        x: int
+        y: dict
+
+    class Opaque(dict):
+        pass
+
+    point = Point(1, {"z": 2})
+    values = array.array("i", [1, 2])
+    opaque = Opaque(a={"b": 1})
+    data = {"p": point, "again": [point], "tags": {3, 1}, "numbers": values, "opaque": opaque}
+
+    register_converter(Point, dataclasses.asdict, unmunchify=False)
+    register_converter(set, sorted)
+    register_converter(Opaque)
+    try:
+        m = munchify(data)
+        assert m.p == Munch(x=1, y=Munch(z=2)) and isinstance(m.p.y, Munch)
+        assert m.again[0] is m.p
+        assert m.tags == [1, 3]
+        assert m.numbers is values
+        assert m.opaque is opaque
+
+        d = unmunchify(Munch(p=point, tags={2}, opaque=opaque))
+        assert d["p"] is point
+        assert d["tags"] == [2]
+        assert d["opaque"] is opaque
+    finally:
+        for cls in (Point, set, Opaque):
+            unregister_converter(cls)
+
+    m = munchify(data)
+    assert m.p is point
+    assert m.tags == {1, 3}
+    assert isinstance(m.opaque, Munch) and isinstance(m.opaque.a, Munch)
+
+
+def test_munchify_many_in_process():
+    records = [{"id": i, "nested": {"n": [i]}} for i in range(10)]
+    result = munchify_many(records)
+    assert result == records
+    assert all(isinstance(m.nested, Munch) for m in result)
+
+    it = munchify_many(iter(records), factory=RecursiveMunch, iterator=True)
+    assert isinstance(next(it).nested, RecursiveMunch)
+    assert len(list(it)) == 9
+
+    assert unmunchify_many(result) == records
+    assert all(type(d["nested"]) is dict for d in unmunchify_many(result))  # pylint: disable=unidiomatic-typecheck
+
+
+def test_munchify_many_pool(monkeypatch):
+    monkeypatch.setattr(munch, "PARALLEL_THRESHOLD", 10)
+    records = [{"id": i, "nested": {"n": [i]}} for i in range(105)]
+
+    result = munchify_many(records, workers=2, chunksize=7)
+    assert [m.id for m in result] == list(range(105))
+    assert all(isinstance(m.nested, Munch) for m in result)
+
+    result = list(munchify_many(iter(records), factory=DefaultMunch, workers=2, chunksize=7, iterator=True))
+    assert result == records
+    assert isinstance(result[-1].nested, DefaultMunch)
+
+    back = unmunchify_many(result, workers=2, chunksize=50)
+    assert back == records
+    assert type(back[0]["nested"]) is dict  # pylint: disable=unidiomatic-typecheck
+
+
 def test_unmunchify():
     b = Munch(foo=Munch(lol=True), hello=42, ponies="are pretty!")
     assert sorted(unmunchify(b).items()) == [
@@ -242,6 +1371,111 @@ def test_toJSON_and_fromJSON():
     assert dm_obj.not_exist is default_value
 
 
+def test_fromJSON_bytes_and_file():
+    payload = '{"foo": {"lol": true}, "rows": [{"a": 1}, [{"b": 2}]]}'
+    for stream in (payload, payload.encode("utf-8"), io.StringIO(payload), io.BytesIO(payload.encode("utf-8"))):
+        obj = Munch.fromJSON(stream)
+        assert obj == {"foo": {"lol": True}, "rows": [{"a": 1}, [{"b": 2}]]}
+        assert type(obj.foo) is Munch  # pylint: disable=unidiomatic-typecheck
+        assert obj.rows[0].a == 1
+        assert obj.rows[1][0].b == 2
+
+
+def test_fromJSON_subclasses():
+    payload = '{"foo": {"bar": {}}}'
+
+    obj = DefaultFactoryMunch.fromJSON(payload, list)
+    assert isinstance(obj.foo.bar, DefaultFactoryMunch)
+    assert obj.foo.bar.missing == []
+
+    obj = RecursiveMunch.fromJSON(payload)
+    assert isinstance(obj.foo.bar, RecursiveMunch)
+    assert obj.foo.bar.missing == RecursiveMunch()
+
+    class DoublingMunch(Munch):
+        def __setitem__(self, k, v):
+            super().__setitem__(k, [v] * 2)
+
+    obj = DoublingMunch.fromJSON('{"a": {"b": 1}}')
+    assert obj.a[0].b == [1, 1]
+
+
+def test_fromJSON_subclass_init_requires_mapping():
+    class TaggedMunch(Munch):
+        def __init__(self, d, tag=None):
+            super().__init__(d, tag=tag)
+
+    obj = TaggedMunch.fromJSON('{"a": {"b": 1}, "c": [{"d": 2}]}', tag="t")
+    assert isinstance(obj.a, TaggedMunch) and isinstance(obj.c[0], TaggedMunch)
+    assert obj.a.b == 1 and obj.c[0].d == 2
+    assert obj.tag == obj.a.tag == "t"
+    lines = list(TaggedMunch.iter_jsonl(io.StringIO('{"a": {"b": 1}}\n')))
+    assert isinstance(lines[0].a, TaggedMunch)
+
+
+def test_jsonl_round_trip(tmp_path):
+    records = [Munch(id=i, nested=Munch(tags=["x"] * (i % 3))) for i in range(2500)]
+    path = tmp_path / "records.jsonl"
+    with open(path, "w") as f:
+        assert Munch.dump_jsonl(iter(records), f) == len(records)
+    with open(path) as f:
+        assert list(Munch.iter_jsonl(f)) == records
+    with open(path, "rb") as f:
+        loaded = list(DefaultMunch.iter_jsonl(f, "default"))
+    assert loaded == records
+    assert loaded[0].nested.missing == "default"
+
+    out = io.BytesIO()
+    Munch.dump_jsonl(records[:2], out, sort_keys=True)
+    assert out.getvalue() == b'{"id": 0, "nested": {"tags": []}}\n{"id": 1, "nested": {"tags": ["x"]}}\n'
+
+    text = io.StringIO()
+    assert Munch.dump_jsonl(records[:2], text, sort_keys=True) == 2
+    assert text.getvalue() == out.getvalue().decode("utf-8")
+
+    class TextSink:
+        def __init__(self):
+            self.parts = []
+
+        def write(self, data):
+            self.parts.append(data)
+
+    class BytesSink(TextSink):
+        def write(self, data):
+            if not isinstance(data, bytes):
+                raise TypeError("a bytes-like object is required")
+            super().write(data)
+
+    # without an io base class or a mode, text is tried first
+    sink = TextSink()
+    Munch.dump_jsonl([Munch(a="é")], sink)
+    assert sink.parts == ['{"a": "\\u00e9"}\n']
+    sink = TextSink()
+    Munch.dump_jsonl([Munch(a="é")], sink, binary=True, ensure_ascii=False)
+    assert sink.parts == ['{"a": "é"}\n'.encode("utf-8")]
+    sink = BytesSink()
+    Munch.dump_jsonl(records[:munch.JSONL_BATCH_SIZE + 1], sink)
+    assert b"".join(sink.parts) == "".join(f"{r.toJSON()}\n" for r in records[:munch.JSONL_BATCH_SIZE + 1]).encode()
+
+    for mode in ("w+", "w+b"):
+        with tempfile.SpooledTemporaryFile(mode=mode) as spooled:
+            assert Munch.dump_jsonl(records[:2], spooled) == 2
+            spooled.seek(0)
+            assert list(Munch.iter_jsonl(spooled)) == records[:2]
+
+
+def test_jsonl_lazy_and_blank_lines():
+    stream = io.StringIO('{"a": 1}\n\n  \n{"a": 2}\n')
+    it = Munch.iter_jsonl(stream)
+    assert next(it).a == 1
+    assert next(it).a == 2
+    with pytest.raises(StopIteration):
+        next(it)
+
+    with pytest.raises(ValueError):
+        Munch.dump_jsonl([Munch()], io.StringIO(), indent=2)
+
+
 @pytest.mark.parametrize("attrname", dir(Munch))
 def test_reserved_attributes(attrname):
     # Make sure that the default attributes on the Munch instance are
@@ -332,6 +1566,16 @@ def test_copy_default():
     undefined = object()
     m = DefaultMunch.fromDict({"urmom": {"sez": {"what": "what"}}}, undefined)
     c = m.copy()
+    assert type(c) is DefaultMunch  # pylint: disable=unidiomatic-typecheck
+    assert c.urmom is m.urmom
+    assert c.foo is undefined
+    assert c == m
+
+
+def test_deep_copy_default():
+    undefined = object()
+    m = DefaultMunch.fromDict({"urmom": {"sez": {"what": "what"}}}, undefined)
+    c = m.deep_copy()
     assert c is not m
     assert c.urmom is not m.urmom
     assert c.urmom.sez is not m.urmom.sez
@@ -419,10 +1663,25 @@ def test_fromDict_default_factory():
 
 
 def test_copy_default_factory():
+    m = DefaultFactoryMunch.fromDict({"urmom": {"sez": {"what": "what"}}}, list)
+    c = m.copy()
+    assert type(c) is DefaultFactoryMunch  # pylint: disable=unidiomatic-typecheck
+    assert c.urmom is m.urmom
+    assert c.default_factory is list
+    assert c.foo == [] and "foo" not in m
+
+    r = RecursiveMunch(a=RecursiveMunch(b=1))
+    c = copy.copy(r)
+    assert type(c) is RecursiveMunch  # pylint: disable=unidiomatic-typecheck
+    assert c.a is r.a
+    assert isinstance(c.missing, RecursiveMunch)
+
+
+def test_deep_copy_default_factory():
     def undefined():
         return object()
     m = DefaultFactoryMunch.fromDict({"urmom": {"sez": {"what": "what"}}}, undefined)
-    c = m.copy()
+    c = m.deep_copy()
     assert c is not m
     assert c.urmom is not m.urmom
     assert c.urmom.sez is not m.urmom.sez
@@ -498,6 +1757,37 @@ def test_munchify_cycle():
     assert m.y[1].y is m.y
 
 
+def test_munchify_unmunchify_deep():
+    depth = 100000
+    nested = leaf = {}
+    for _ in range(depth):
+        leaf["next"] = [{}, (leaf.setdefault("id", 1),)]
+        leaf = leaf["next"][0]
+
+    m = munchify(nested)
+    node = m
+    for _ in range(depth):
+        assert isinstance(node, Munch)
+        node = node.next[0]
+
+    d = unmunchify(m)
+    node = d
+    for _ in range(depth):
+        assert type(node) is dict  # pylint: disable=unidiomatic-typecheck
+        node = node["next"][0]
+
+    nested_tuple = ()
+    for i in range(depth):
+        nested_tuple = (nested_tuple, {"i": i})
+    assert munchify(nested_tuple)[1].i == depth - 1
+
+
+def test_munchify_shared_objects():
+    shared = {"a": 1}
+    m = munchify({"x": shared, "y": [shared], "z": (shared,)})
+    assert m.x is m.y[0] is m.z[0]
+
+
 def test_unmunchify_cycle():
     # munch -> munch -> munch
     x = Munch(id="x")
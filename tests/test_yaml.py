@@ -70,3 +70,62 @@ def test_fromYAML_default_munch():
     assert obj["not_exist"] is default_value
     assert obj.not_exist is default_value
     assert obj.toYAML() == yaml_str
+
+
+def test_munch_loaders(yaml):
+    # pylint: disable=unidiomatic-typecheck
+    import munch  # pylint: disable=import-outside-toplevel
+
+    yaml_str = """
+base: &base {a: 1, nested: {b: 2}}
+derived:
+  <<: *base
+  c: [{d: 3}]
+tagged: !munch {e: 4}
+"""
+    for loader in (munch.MunchLoader, munch.MunchSafeLoader):
+        data = yaml.load(yaml_str, Loader=loader)
+        assert type(data) == Munch
+        assert type(data.base.nested) == Munch
+        assert data.derived.a == 1
+        assert data.derived.nested is data.base.nested
+        assert data.derived.c[0].d == 3
+        assert type(data.tagged) == Munch
+
+    if yaml.__with_libyaml__:
+        assert issubclass(munch.MunchLoader, yaml.CFullLoader)
+        assert issubclass(munch.MunchSafeLoader, yaml.CSafeLoader)
+
+
+def test_fromYAML_builds_subclass_nodes(yaml):
+    # pylint: disable=unidiomatic-typecheck
+    default_value = object()
+    obj = DefaultMunch.fromYAML("a: {b: [{c: 1}]}\nd: &x {e: 2}\nf: *x\n", default_value)
+    assert type(obj.a) == DefaultMunch
+    assert type(obj.a.b[0]) == DefaultMunch
+    assert obj.a.b[0].missing is default_value
+    assert obj.f is obj.d
+
+    obj = Munch.fromYAML("a: {b: 1}", Loader=yaml.SafeLoader)
+    assert type(obj.a) == Munch
+
+
+def test_fromYAML_subclass_init_requires_mapping(yaml):  # pylint: disable=unused-argument
+    class TaggedMunch(Munch):
+        def __init__(self, d, tag=None):
+            super().__init__(d, tag=tag)
+
+    obj = TaggedMunch.fromYAML("a: {b: [{c: 1}]}", tag="t")
+    assert isinstance(obj.a, TaggedMunch) and isinstance(obj.a.b[0], TaggedMunch)
+    assert obj.a.b[0].c == 1 and obj.a.tag == "t"
+
+
+def test_fromYAML_intern_keys(yaml):
+    first = Munch.fromYAML("name: {name: 1}", intern_keys=True)
+    second = Munch.fromYAML("name: 2", Loader=yaml.SafeLoader, intern_keys=True)
+    assert next(iter(first)) is next(iter(first.name)) is next(iter(second))
+
+
+def test_toYAML_round_trip(yaml):  # pylint: disable=unused-argument
+    b = Munch(foo=["bar", Munch(lol=True)], hello=42, nested=Munch(deep=Munch(x=1.5)))
+    assert Munch.fromYAML(b.toYAML()) == b